@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Command-line entry point for the BakuGuide toolkit.
+
+    python bakuguide.py scrape [--pages 50] [--no-archive] [--profile]
+    python bakuguide.py refresh [--sitemap URL_OR_FILE] [--no-archive]
+    python bakuguide.py charts
+    python bakuguide.py query --cuisine Türk --feature Wi-Fi --max-price 20
+    python bakuguide.py query --serve --port 8765
+    python bakuguide.py stats
+    python bakuguide.py startup-check
+
+Only the standard library is imported at module load. Each subcommand
+imports what it needs (aiohttp, pandas, NumPy, ...) when it runs, so quick
+commands like `stats` start almost as fast as the bare interpreter.
+`startup-check` enforces that with a timing budget.
+"""
+import argparse
+import os
+import sys
+
+from dataset import DEFAULT_ARCHIVE, DEFAULT_CSV, DEFAULT_STATE
+
+# Extra startup time allowed over a bare `python -c pass`, in milliseconds
+STARTUP_BUDGET_MS = 75
+# Modules that must never be imported just to start the CLI
+HEAVY_MODULES = ('aiohttp', 'bs4', 'lxml', 'numpy', 'pandas', 'matplotlib', 'seaborn', 'zstandard')
+
+
+def cmd_scrape(args):
+    """Full crawl of all listing and detail pages"""
+    import asyncio
+    from scraper import BakuGuideScraper
+
+    profiler = None
+    if args.profile:
+        from profiling import ParseProfiler
+        profiler = ParseProfiler(args.profile_sample)
+
+    async def run():
+        archive_path = None if args.no_archive else args.archive
+        async with BakuGuideScraper(max_concurrent=args.concurrency, archive_path=archive_path,
+                                    profiler=profiler) as scraper:
+            restaurants = await scraper.scrape_all_restaurants(total_pages=args.pages)
+            scraper.save_to_csv(restaurants, args.csv, delta_dir='deltas')
+
+    asyncio.run(run())
+    if profiler:
+        profiler.finish(args.profile_output)
+
+
+def cmd_refresh(args):
+    """Incremental refresh driven by the sitemap"""
+    import asyncio
+    import logging
+    from sitemap import SitemapError, refresh
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        asyncio.run(refresh(args.csv, args.sitemap, args.state, not args.no_card_fields,
+                            None if args.no_archive else args.archive))
+    except SitemapError as e:
+        logging.getLogger(__name__).error(f"Refresh aborted, {args.csv} left unchanged: {e}")
+        sys.exit(1)
+
+
+def cmd_charts(args):
+    """Regenerate the business-intelligence charts"""
+    import runpy
+
+    # The chart script does its work at module level, so it is run rather than
+    # imported, with the CSV passed the way its own command line takes it
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'generate_business_charts.py')
+    sys.argv = [script, args.csv]
+    runpy.run_path(script, run_name='__main__')
+
+
+def cmd_query(args):
+    """One-off filtered lookup, or serve the JSON query service"""
+    import json
+    import logging
+
+    from query_service import CatalogService, make_handler
+
+    if args.serve:
+        from http.server import ThreadingHTTPServer
+
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        server = ThreadingHTTPServer((args.host, args.port), make_handler(CatalogService(args.csv)))
+        print(f"Serving {args.csv} on http://{args.host}:{args.port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return
+
+    index = CatalogService(args.csv).index
+    result = index.query(cuisine=args.cuisine, features=args.feature, category=args.category,
+                         min_price=args.min_price, max_price=args.max_price,
+                         lat=args.lat, lon=args.lon, radius_km=args.radius_km, limit=args.limit)
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        for record in result['results']:
+            print(f"{record['name'][:40]:40} {record['avg_cost_2_people'] or '-':>8}  {record['address'][:50]}")
+        print(f"\n{result['count']} matching restaurants")
+
+
+def _age(path: str) -> str:
+    import time
+
+    seconds = time.time() - os.path.getmtime(path)
+    for unit, size in (('d', 86400), ('h', 3600), ('m', 60)):
+        if seconds >= size:
+            return f"{seconds / size:.1f}{unit} ago"
+    return f"{seconds:.0f}s ago"
+
+
+def cmd_stats(args):
+    """Status of the dataset, deltas, archive and refresh state"""
+    import csv
+
+    if os.path.exists(args.csv):
+        with open(args.csv, newline='', encoding='utf-8') as f:
+            rows = sum(1 for _ in csv.reader(f)) - 1
+        print(f"dataset   {args.csv}: {rows} restaurants, updated {_age(args.csv)}")
+    else:
+        print(f"dataset   {args.csv}: missing")
+
+    deltas = sorted(f for f in os.listdir('deltas') if f.endswith('.jsonl')) if os.path.isdir('deltas') else []
+    if deltas:
+        latest = os.path.join('deltas', deltas[-1])
+        with open(latest, encoding='utf-8') as f:
+            header = f.readline().strip()
+        print(f"deltas    {len(deltas)} files, latest {deltas[-1]} {header}")
+    else:
+        print("deltas    none")
+
+    if os.path.exists(args.archive):
+        size = f"{os.path.getsize(args.archive) / 1e6:.1f} MB"
+        if os.path.exists(f"{args.archive}.idx"):
+            with open(f"{args.archive}.idx", encoding='utf-8') as f:
+                pages = len({line.rsplit('\t', 2)[0] for line in f})
+            print(f"archive   {args.archive}: {pages} pages, {size}")
+        else:
+            # Rebuilt from the pack the next time the archive is opened
+            print(f"archive   {args.archive}: {size}, index missing")
+    else:
+        print("archive   none")
+
+    if os.path.exists(args.state):
+        print(f"sitemap   {args.state}: updated {_age(args.state)}")
+    else:
+        print("sitemap   never refreshed")
+
+
+def _median_ms(command, runs: int) -> float:
+    import statistics
+    import subprocess
+    import time
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def cmd_startup_check(args):
+    """Fail if starting the CLI costs more than the budget or pulls in heavy modules"""
+    import subprocess
+
+    script = os.path.abspath(__file__)
+    loaded = subprocess.run(
+        [sys.executable, '-c',
+         f"import runpy, sys; sys.argv = ['bakuguide', '--help']\n"
+         f"try:\n    runpy.run_path({script!r}, run_name='__main__')\nexcept SystemExit:\n    pass\n"
+         f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules), file=sys.stderr)"],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True).stderr.split()
+
+    baseline = _median_ms([sys.executable, '-c', 'pass'], args.runs)
+    startup = _median_ms([sys.executable, script, 'stats'], args.runs)
+    overhead = startup - baseline
+    print(f"interpreter {baseline:.1f} ms, `bakuguide stats` {startup:.1f} ms "
+          f"(+{overhead:.1f} ms, budget {args.budget_ms} ms)")
+
+    failed = False
+    if loaded:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(loaded)}")
+        failed = True
+    if overhead > args.budget_ms:
+        print("FAIL: startup over budget")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("OK")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='bakuguide', description='BakuGuide restaurant data toolkit')
+    parser.add_argument('--csv', default=DEFAULT_CSV, help='restaurant CSV (default: %(default)s)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    scrape = subparsers.add_parser('scrape', help=cmd_scrape.__doc__)
+    scrape.add_argument('--pages', type=int, default=50)
+    scrape.add_argument('--concurrency', type=int, default=10)
+    scrape.add_argument('--archive', default=DEFAULT_ARCHIVE)
+    scrape.add_argument('--no-archive', action='store_true')
+    scrape.add_argument('--profile', action='store_true', help='time each detail-page field extractor')
+    scrape.add_argument('--profile-sample', type=float, default=0.05,
+                        help='fraction of detail pages run under cProfile (default: %(default)s)')
+    scrape.add_argument('--profile-output', default='parse_profile.folded')
+    scrape.set_defaults(func=cmd_scrape)
+
+    refresh = subparsers.add_parser('refresh', help=cmd_refresh.__doc__)
+    refresh.add_argument('--sitemap', help='sitemap URL or local file (default: from robots.txt)')
+    refresh.add_argument('--state', default=DEFAULT_STATE)
+    refresh.add_argument('--no-card-fields', action='store_true')
+    refresh.add_argument('--archive', default=DEFAULT_ARCHIVE)
+    refresh.add_argument('--no-archive', action='store_true')
+    refresh.set_defaults(func=cmd_refresh)
+
+    charts = subparsers.add_parser('charts', help=cmd_charts.__doc__)
+    charts.set_defaults(func=cmd_charts)
+
+    query = subparsers.add_parser('query', help=cmd_query.__doc__)
+    query.add_argument('--cuisine', action='append')
+    query.add_argument('--feature', action='append')
+    query.add_argument('--category', action='append')
+    query.add_argument('--min-price', type=float)
+    query.add_argument('--max-price', type=float)
+    query.add_argument('--lat', type=float)
+    query.add_argument('--lon', type=float)
+    query.add_argument('--radius-km', type=float)
+    query.add_argument('--limit', type=int, default=20)
+    query.add_argument('--json', action='store_true')
+    query.add_argument('--serve', action='store_true', help='run the HTTP/JSON service instead')
+    query.add_argument('--host', default='127.0.0.1')
+    query.add_argument('--port', type=int, default=8765)
+    query.set_defaults(func=cmd_query)
+
+    stats = subparsers.add_parser('stats', help=cmd_stats.__doc__)
+    stats.add_argument('--archive', default=DEFAULT_ARCHIVE)
+    stats.add_argument('--state', default=DEFAULT_STATE)
+    stats.set_defaults(func=cmd_stats)
+
+    startup_check = subparsers.add_parser('startup-check', help=cmd_startup_check.__doc__)
+    startup_check.add_argument('--budget-ms', type=float, default=STARTUP_BUDGET_MS)
+    startup_check.add_argument('--runs', type=int, default=7)
+    startup_check.set_defaults(func=cmd_startup_check)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Helpers for loading the scraped BakuGuide restaurant CSV.
+"""
+import csv
+import math
+import re
+import unicodedata
+from typing import List, Dict, Iterator
+
+DEFAULT_CSV = 'bakuguide_restaurants.csv'
+# Every crawl archives the raw pages here unless archiving is switched off
+DEFAULT_ARCHIVE = 'archive/bakuguide.pack'
+# Last-seen sitemap <lastmod> per URL, for incremental refreshes
+DEFAULT_STATE = 'sitemap_state.json'
+
+# Letters without a Unicode decomposition that still need folding
+_FOLD = str.maketrans({'ə': 'e', 'ı': 'i', 'ø': 'o', 'ß': 'ss'})
+
+
+def load_restaurants(filename: str = DEFAULT_CSV) -> List[Dict]:
+    """Load restaurant rows from the scraped CSV file"""
+    with open(filename, newline='', encoding='utf-8') as csvfile:
+        return list(csv.DictReader(csvfile))
+
+
+def iter_restaurants(filename: str = DEFAULT_CSV) -> Iterator[Dict]:
+    """Stream restaurant rows from the scraped CSV file one at a time"""
+    with open(filename, newline='', encoding='utf-8') as csvfile:
+        yield from csv.DictReader(csvfile)
+
+
+def split_multi(value) -> List[str]:
+    """Split a '; '-joined multi-value field (cuisine, features, phones, ...)"""
+    if not value:
+        return []
+    return [part.strip() for part in str(value).split(';') if part.strip()]
+
+
+def parse_float(value) -> float:
+    """Parse a numeric field, returning NaN when it is empty or malformed"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def parse_price(value) -> float:
+    """Average cost for 2 people as a number ('15-25' -> 20.0), NaN when missing"""
+    numbers = re.findall(r'\d+', str(value or ''))
+    if not numbers:
+        return math.nan
+    return sum(int(n) for n in numbers) / len(numbers)
+
+
+def normalize(text: str) -> str:
+    """Case- and diacritic-insensitive form of Azerbaijani text"""
+    # Turkic casing: dotted İ -> i and dotless I -> ı, before str.lower()
+    text = (text or '').replace('İ', 'i').replace('I', 'ı').lower()
+    text = unicodedata.normalize('NFKD', text.translate(_FOLD))
+    return ''.join(ch for ch in text if not unicodedata.combining(ch))
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Duplicate-venue detection for scraped restaurant records.
+
+The same venue can appear under several detail URLs with slightly
+different names and differently formatted phones. Records are normalized,
+grouped into candidate blocks (shared phone, nearby grid cell, rare name
+trigram) and only pairs inside a block are scored, so the work grows with
+block sizes rather than with the square of the catalog.
+
+    python dedupe.py
+    python dedupe.py --output bakuguide_restaurants_deduped.csv
+"""
+import argparse
+import csv
+import logging
+import math
+import re
+from collections import Counter, defaultdict
+from itertools import combinations
+from typing import List, Dict, Set, Tuple, Optional
+
+import numpy as np
+
+from dataset import load_restaurants, split_multi, parse_float, normalize, DEFAULT_CSV
+from geo import haversine, EARTH_RADIUS_KM
+
+logger = logging.getLogger(__name__)
+
+# Grid cell size for geo blocking; pairs further apart than this are never compared
+GEO_CELL_KM = 0.2
+# Number of rarest name trigrams each record is blocked on
+NAME_BLOCK_GRAMS = 4
+# Blocks bigger than this (e.g. a very common trigram) carry no signal and are skipped
+MAX_BLOCK_SIZE = 40
+
+_GENERIC_NAME_WORDS = {
+    'restoran', 'restorani', 'restaurant', 'restaurants', 'kafe', 'cafe', 'pub', 'bar',
+    'lounge', 'club', 'klub', 'house', 'the', 'and', 've', 'by',
+    # Country and city words franchises append to the brand ("Cinnabon Azerbaijan")
+    'azerbaijan', 'azerbaycan', 'azeri', 'baku', 'baki',
+}
+# Latin spellings of Azerbaijani letters seen in venue names (Korchma / Korçma)
+_TRANSLITERATIONS = [('ch', 'c'), ('sh', 's'), ('gh', 'g'), ('q', 'g'), ('x', 'h'), ('w', 'v')]
+_ADDRESS_ABBREVIATIONS = [
+    (r'\bkucesi\b|\bkuc\b', 'kuc'),
+    (r'\bprospekti\b|\bpr\b', 'pr'),
+    (r'\bmeydani\b|\bmeyd\b', 'meyd'),
+    (r'\bseheri\b|\bs\b', ''),
+    (r'\bbaki\b', ''),
+]
+
+
+def normalize_phone(phone: str) -> str:
+    """Canonical 9-digit Azerbaijani number ('012 564 44 39', '+994125644439' -> '125644439')"""
+    digits = re.sub(r'\D', '', phone or '')
+    if digits.startswith('994'):
+        digits = digits[3:]
+    return digits.lstrip('0')
+
+
+def normalize_name(name: str) -> str:
+    """Folded venue name without punctuation and generic words like 'restoran'"""
+    text = normalize(name)
+    for latin, azerbaijani in _TRANSLITERATIONS:
+        text = text.replace(latin, azerbaijani)
+    tokens = re.findall(r'\w+', text)
+    kept = [t for t in tokens if t not in _GENERIC_NAME_WORDS]
+    return ' '.join(kept or tokens)
+
+
+def normalize_address(address: str) -> str:
+    """Folded address with common abbreviations unified"""
+    text = ' '.join(re.findall(r'\w+', normalize(address)))
+    for pattern, replacement in _ADDRESS_ABBREVIATIONS:
+        text = re.sub(pattern, replacement, text)
+    return ' '.join(text.split())
+
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of a normalized string"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _jaccard(a: Set, b: Set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class _Entity:
+    """Normalized view of one record used for blocking and scoring"""
+
+    __slots__ = ('phones', 'name', 'name_grams', 'address_tokens', 'house_numbers', 'lat', 'lon')
+
+    def __init__(self, record: Dict):
+        self.phones = {p for p in (normalize_phone(x) for x in split_multi(record.get('phones'))) if len(p) >= 7}
+        self.name = normalize_name(record.get('name', ''))
+        self.name_grams = trigrams(self.name)
+        self.address_tokens = set(normalize_address(record.get('address', '')).split())
+        self.house_numbers = {int(n) for t in self.address_tokens for n in re.findall(r'\d+', t)}
+        self.lat = parse_float(record.get('latitude'))
+        self.lon = parse_float(record.get('longitude'))
+
+    @property
+    def has_coords(self) -> bool:
+        return not (math.isnan(self.lat) or math.isnan(self.lon))
+
+
+def score_pair(a: _Entity, b: _Entity, distance: Optional[float] = None) -> Dict[str, Optional[float]]:
+    """Similarity evidence for a candidate pair; distance (km) may be precomputed"""
+    if distance is None and a.has_coords and b.has_coords:
+        distance = float(haversine(a.lat, a.lon, b.lat, b.lon))
+    elif distance is not None and math.isnan(distance):
+        distance = None
+
+    location = None
+    if a.address_tokens and b.address_tokens:
+        location = _jaccard(a.address_tokens, b.address_tokens)
+    if distance is not None:
+        # 1.0 within 50 m, falling to 0 at GEO_CELL_KM
+        closeness = min(1.0, max(0.0, (GEO_CELL_KM - distance) / (GEO_CELL_KM - 0.05)))
+        location = max(location or 0.0, closeness)
+
+    # Numbers in an address ("28 May küç. 5/7") may be extra detail on one
+    # side, but two sets that disagree outright point to different buildings
+    house_match = None
+    if a.house_numbers and b.house_numbers:
+        house_match = a.house_numbers <= b.house_numbers or b.house_numbers <= a.house_numbers
+
+    return {
+        'phone': 1.0 if a.phones & b.phones else 0.0,
+        'name': _jaccard(a.name_grams, b.name_grams),
+        'location': location,
+        'house_number_match': house_match,
+        'distance_km': distance,
+    }
+
+
+def is_duplicate(scores: Dict[str, Optional[float]]) -> bool:
+    """Decide a pair from its evidence.
+
+    Names always have to agree to some degree: venues inside one hotel or
+    mall share both the address and the switchboard phone. Conflicting house
+    numbers veto a match outright: chain branches and franchises share the
+    name or phone but never the building.
+    """
+    phone, name, location = scores['phone'], scores['name'], scores['location']
+    if scores.get('house_number_match') is False:
+        return False
+    if location is None:
+        return phone == 1.0 and name >= 0.8
+    if location < 0.5:
+        return False
+    return name >= 0.5 or (phone == 1.0 and name >= 0.3)
+
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+def candidate_pairs(entities: List[_Entity]) -> Set[Tuple[int, int]]:
+    """Record pairs sharing at least one block"""
+    blocks: Dict[Tuple, List[int]] = defaultdict(list)
+    cells: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+
+    # Name blocking only uses each record's rarest trigrams
+    gram_counts = Counter(gram for entity in entities for gram in entity.name_grams)
+
+    for i, entity in enumerate(entities):
+        for phone in entity.phones:
+            blocks[('phone', phone)].append(i)
+        for gram in sorted(entity.name_grams, key=lambda g: (gram_counts[g], g))[:NAME_BLOCK_GRAMS]:
+            blocks[('name', gram)].append(i)
+        if entity.has_coords:
+            y = entity.lat / math.degrees(GEO_CELL_KM / EARTH_RADIUS_KM)
+            x = entity.lon * math.cos(math.radians(entity.lat)) / math.degrees(GEO_CELL_KM / EARTH_RADIUS_KM)
+            cells[(math.floor(x), math.floor(y))].append(i)
+
+    pairs: Set[Tuple[int, int]] = set()
+    skipped = 0
+    for members in blocks.values():
+        if len(members) > MAX_BLOCK_SIZE:
+            skipped += 1
+            continue
+        pairs.update(combinations(members, 2))
+
+    # A cell is compared with itself and its forward neighbors, so every
+    # pair closer than one cell is seen exactly once
+    for (cx, cy), members in cells.items():
+        pairs.update(combinations(members, 2))
+        for dx, dy in ((1, 0), (-1, 1), (0, 1), (1, 1)):
+            for j in cells.get((cx + dx, cy + dy), ()):
+                pairs.update((min(i, j), max(i, j)) for i in members)
+
+    logger.info(f"{len(pairs)} candidate pairs from {len(blocks) + len(cells)} blocks "
+                f"({skipped} oversized blocks skipped)")
+    return {(min(i, j), max(i, j)) for i, j in pairs if i != j}
+
+
+def find_duplicates(records: List[Dict]) -> List[List[int]]:
+    """Clusters (lists of record positions) of records describing the same venue"""
+    entities = [_Entity(r) for r in records]
+    union_find = _UnionFind(len(records))
+    pairs = sorted(candidate_pairs(entities))
+    if not pairs:
+        return []
+
+    # All pair distances in one vectorized call; NaN where coordinates are missing
+    left, right = np.array(pairs).T
+    lat = np.array([e.lat for e in entities])
+    lon = np.array([e.lon for e in entities])
+    distances = haversine(lat[left], lon[left], lat[right], lon[right])
+
+    for (i, j), distance in zip(pairs, distances.tolist()):
+        if is_duplicate(score_pair(entities[i], entities[j], distance)):
+            union_find.union(i, j)
+
+    clusters: Dict[int, List[int]] = defaultdict(list)
+    for i in range(len(records)):
+        clusters[union_find.find(i)].append(i)
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+def drop_duplicates(records: List[Dict]) -> List[Dict]:
+    """Keep the most complete record of every duplicate cluster, preserving order"""
+    drop = set()
+    for cluster in find_duplicates(records):
+        keep = max(cluster, key=lambda i: (sum(1 for v in records[i].values() if v), -i))
+        drop.update(i for i in cluster if i != keep)
+    return [r for i, r in enumerate(records) if i not in drop]
+
+
+def main():
+    """Report duplicate clusters in the scraped CSV"""
+    parser = argparse.ArgumentParser(description='Find duplicate venues in the scraped CSV')
+    parser.add_argument('--csv', default=DEFAULT_CSV)
+    parser.add_argument('--output', help='write a deduplicated copy of the CSV here')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    records = load_restaurants(args.csv)
+    clusters = find_duplicates(records)
+
+    for cluster in clusters:
+        print(' | '.join(f"{records[i]['name']} ({records[i]['url'].rsplit('/', 1)[-1]})" for i in cluster))
+    print(f"\n{len(clusters)} duplicate clusters covering {sum(len(c) for c in clusters)} records")
+
+    if args.output:
+        deduped = drop_duplicates(records)
+        with open(args.output, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=list(records[0].keys()))
+            writer.writeheader()
+            writer.writerows(deduped)
+        logger.info(f"Saved {len(deduped)} restaurants to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,13 +4,16 @@ import seaborn as sns
 import numpy as np
 from collections import Counter
 import re
+import sys
+
+from working_hours import HoursIndex, DAY_MINUTES
 
 # Set style
 plt.style.use('seaborn-v0_8-darkgrid')
 sns.set_palette("husl")
 
-# Read data
-df = pd.read_csv('bakuguide_restaurants.csv')
+# Read data (optionally from the CSV given on the command line)
+df = pd.read_csv(sys.argv[1] if len(sys.argv) > 1 else 'bakuguide_restaurants.csv')
 
 print("Generating business intelligence charts...")
 
@@ -234,10 +237,14 @@ hours_categories = {
     'Standard Hours': []
 }
 
-for idx, row in df.iterrows():
-    if pd.notna(row['working_hours']) and row['working_hours']:
-        hours_str = str(row['working_hours']).lower()
+hours_index = HoursIndex.from_records(df.fillna('').to_dict('records'))
+# Extended hours: still open at 23:30 on at least one day of the week
+open_late = np.zeros(len(df), dtype=bool)
+for day in range(7):
+    open_late |= hours_index.open_at(day * DAY_MINUTES + 23 * 60 + 30)
 
+for i, (_, row) in enumerate(df.iterrows()):
+    if hours_index.known[i]:
         # Get price if available
         price = None
         if pd.notna(row['avg_cost_2_people']) and row['avg_cost_2_people']:
@@ -246,9 +253,9 @@ for idx, row in df.iterrows():
                 price = np.mean([int(n) for n in numbers])
 
         if price:
-            if '24' in hours_str or 'saat' in hours_str:
+            if hours_index.always_open[i]:
                 hours_categories['24/7'].append(price)
-            elif any(h in hours_str for h in ['23:', '00:', '01:', '02:']):
+            elif open_late[i]:
                 hours_categories['Extended Hours'].append(price)
             else:
                 hours_categories['Standard Hours'].append(price)
@@ -0,0 +1,408 @@
+"""
+Spatial index and vectorized geo-analytics over restaurant coordinates.
+
+Venues are bucketed into a uniform grid of square cells (in km) so that
+radius and nearest-neighbor queries only compare a venue against the
+handful of cells around it instead of the whole catalog.
+"""
+import logging
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+
+from dataset import load_restaurants, split_multi, parse_float, DEFAULT_CSV
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+# ((lat_min, lat_max), (lon_min, lon_max)) of Baku and the Absheron peninsula
+BAKU_BOUNDS = ((40.25, 40.65), (49.6, 50.4))
+# Cuisines with at most this many venues skip the grid in same-cuisine searches
+BRUTE_FORCE_VENUES = 256
+# Venues per occupied cell the per-cuisine grids of same-cuisine searches aim for
+CUISINE_CELL_VENUES = 32
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; inputs broadcast like NumPy arrays"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def unit_vectors(lat, lon) -> np.ndarray:
+    """Points on the unit sphere; their dot product is the cosine of the central angle"""
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+    return np.stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)), axis=-1)
+
+
+class GeoIndex:
+    """Uniform grid index over venue coordinates"""
+
+    def __init__(self, lat, lon, cuisines: Optional[List[List[str]]] = None, cell_km: float = 1.0):
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        valid = np.isfinite(lat) & np.isfinite(lon)
+
+        # Positions of the indexed venues in the original input
+        self.ids = np.flatnonzero(valid)
+        self.lat = lat[valid]
+        self.lon = lon[valid]
+        self.cell_km = cell_km
+        # Pairwise block comparisons use dot products instead of trig per pair
+        self._xyz = unit_vectors(self.lat, self.lon)
+
+        # Cuisine membership matrix (venue x cuisine) for competitor filters
+        self.cuisine_names: List[str] = []
+        self.cuisine_matrix = np.zeros((len(self.ids), 0), dtype=bool)
+        if cuisines is not None:
+            indexed = [cuisines[i] for i in self.ids]
+            self.cuisine_names = sorted({c for venue in indexed for c in venue})
+            column = {name: j for j, name in enumerate(self.cuisine_names)}
+            self.cuisine_matrix = np.zeros((len(self.ids), len(self.cuisine_names)), dtype=bool)
+            for i, venue in enumerate(indexed):
+                self.cuisine_matrix[i, [column[c] for c in venue]] = True
+
+        # Float copy so shared-cuisine tests run as a BLAS matrix product
+        self._cuisine_weights = self.cuisine_matrix.astype(np.float32)
+
+        # Project onto a local plane. Using the largest |latitude| for the
+        # east-west scale keeps projected distances <= true distances, so a
+        # ring of cells never misses a venue that is within the radius.
+        self._cos_ref = np.cos(np.radians(np.abs(self.lat).max())) if len(self.lat) else 1.0
+        cx, cy = self._cell_coords(self.lat, self.lon)
+        self._cx0 = int(cx.min()) if len(cx) else 0
+        self._cy0 = int(cy.min()) if len(cy) else 0
+        cx -= self._cx0
+        cy -= self._cy0
+        self._ncx = int(cx.max()) + 1 if len(cx) else 1
+        self._ncy = int(cy.max()) + 1 if len(cy) else 1
+
+        # Sort venues by cell key; every row of cells is then a contiguous slice
+        keys = cy * self._ncx + cx
+        self._order = np.argsort(keys, kind='stable')
+        self._sorted_keys = keys[self._order]
+        self._cx = cx
+        self._cy = cy
+
+        logger.debug(f"Indexed {len(self.ids)} venues into a {self._ncx}x{self._ncy} grid "
+                    f"of {cell_km} km cells")
+
+    @classmethod
+    def from_records(cls, records: List[Dict], cell_km: float = 1.0) -> 'GeoIndex':
+        """Build an index from scraped restaurant dicts"""
+        lat = [parse_float(r.get('latitude')) for r in records]
+        lon = [parse_float(r.get('longitude')) for r in records]
+        cuisines = [split_multi(r.get('cuisine')) for r in records]
+        return cls(lat, lon, cuisines, cell_km=cell_km)
+
+    @classmethod
+    def from_csv(cls, filename: str = DEFAULT_CSV, cell_km: float = 1.0) -> 'GeoIndex':
+        """Build an index from the scraped CSV file"""
+        return cls.from_records(load_restaurants(filename), cell_km=cell_km)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _cell_coords(self, lat, lon) -> Tuple[np.ndarray, np.ndarray]:
+        """Absolute grid cell coordinates for the given points"""
+        x = np.radians(lon) * EARTH_RADIUS_KM * self._cos_ref
+        y = np.radians(lat) * EARTH_RADIUS_KM
+        return (np.floor(np.asarray(x) / self.cell_km).astype(np.int64),
+                np.floor(np.asarray(y) / self.cell_km).astype(np.int64))
+
+    def _points_in_cells(self, cx_lo: int, cx_hi: int, cy_lo: int, cy_hi: int) -> np.ndarray:
+        """Internal positions of all venues inside a rectangle of cells"""
+        cx_lo, cx_hi = max(cx_lo, 0), min(cx_hi, self._ncx - 1)
+        cy_lo, cy_hi = max(cy_lo, 0), min(cy_hi, self._ncy - 1)
+        if cx_lo > cx_hi or cy_lo > cy_hi:
+            return np.empty(0, dtype=np.int64)
+
+        rows = np.arange(cy_lo, cy_hi + 1) * self._ncx
+        starts = np.searchsorted(self._sorted_keys, rows + cx_lo, side='left')
+        ends = np.searchsorted(self._sorted_keys, rows + cx_hi, side='right')
+        # Concatenate the per-row slices without a Python loop
+        lengths = ends - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return self._order[offsets + np.arange(lengths.sum())]
+
+    def _cuisine_mask(self, cuisine: Optional[str]) -> np.ndarray:
+        """Boolean mask of indexed venues serving the given cuisine"""
+        if cuisine is None:
+            return np.ones(len(self.ids), dtype=bool)
+        if cuisine not in self.cuisine_names:
+            return np.zeros(len(self.ids), dtype=bool)
+        return self.cuisine_matrix[:, self.cuisine_names.index(cuisine)]
+
+    def _occupied_cells(self):
+        """Yield (members, cx, cy) for every non-empty cell"""
+        if not len(self.ids):
+            return
+        boundaries = np.flatnonzero(np.diff(self._sorted_keys)) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(self._sorted_keys)]))
+        for s, e in zip(starts, ends):
+            members = self._order[s:e]
+            yield members, int(self._cx[members[0]]), int(self._cy[members[0]])
+
+    def _pair_mask(self, members: np.ndarray, cand: np.ndarray, same_cuisine: bool) -> np.ndarray:
+        """Valid (member, candidate) pairs: not the venue itself, optionally sharing a cuisine"""
+        mask = members[:, None] != cand[None, :]
+        if same_cuisine:
+            shared = self._cuisine_weights[members] @ self._cuisine_weights[cand].T
+            mask &= shared > 0
+        return mask
+
+    def query_radius(self, lat: float, lon: float, radius_km: float,
+                     cuisine: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Venues within radius_km of a point, nearest first.
+
+        Returns (input positions, distances in km).
+        """
+        cx, cy = self._cell_coords(lat, lon)
+        cx, cy = int(cx) - self._cx0, int(cy) - self._cy0
+        ring = int(np.ceil(radius_km / self.cell_km))
+        cand = self._points_in_cells(cx - ring, cx + ring, cy - ring, cy + ring)
+        cand = cand[self._cuisine_mask(cuisine)[cand]]
+
+        dist = haversine(lat, lon, self.lat[cand], self.lon[cand])
+        keep = dist <= radius_km
+        cand, dist = cand[keep], dist[keep]
+        order = np.argsort(dist, kind='stable')
+        return self.ids[cand[order]], dist[order]
+
+    def radius_counts(self, radius_km: float, cuisine: Optional[str] = None,
+                      same_cuisine: bool = False) -> np.ndarray:
+        """Number of other venues within radius_km of every indexed venue.
+
+        cuisine restricts the counted neighbors to one cuisine; same_cuisine
+        counts only neighbors sharing at least one cuisine with the venue.
+        Counts are aligned with self.ids.
+        """
+        counts = np.zeros(len(self.ids), dtype=np.int64)
+        target = self._cuisine_mask(cuisine)
+        ring = int(np.ceil(radius_km / self.cell_km))
+        min_similarity = np.cos(radius_km / EARTH_RADIUS_KM)
+
+        for members, cx, cy in self._occupied_cells():
+            cand = self._points_in_cells(cx - ring, cx + ring, cy - ring, cy + ring)
+            cand = cand[target[cand]]
+            if not len(cand):
+                continue
+            similarity = self._xyz[members] @ self._xyz[cand].T
+            hit = (similarity >= min_similarity) & self._pair_mask(members, cand, same_cuisine)
+            counts[members] = hit.sum(axis=1)
+
+        return counts
+
+    def _knn_block(self, qlat: np.ndarray, qlon: np.ndarray, cx: int, cy: int, k: int,
+                   members: Optional[np.ndarray] = None):
+        """k nearest venues for a batch of query points sharing one cell"""
+        n = len(qlat)
+        qxyz = unit_vectors(qlat, qlon)
+        neighbors = np.full((n, k), -1, dtype=np.int64)
+        distances = np.full((n, k), np.inf)
+        # Ring that covers the whole grid; no search ever needs to go wider
+        full_ring = max(cx, self._ncx - 1 - cx, cy, self._ncy - 1 - cy, 1)
+
+        # Rows still searching; each one leaves the batch as soon as it is
+        # resolved, so a venue without competitors only widens its own search
+        active = np.arange(n)
+        ring = 1
+        while len(active):
+            ring = min(ring, full_ring)
+            cand = self._points_in_cells(cx - ring, cx + ring, cy - ring, cy + ring)
+            # Rank by negated dot product: smaller means closer
+            key = -(qxyz[active] @ self._xyz[cand].T)
+            if members is not None:
+                # A venue is not its own competitor
+                key = np.where(members[active][:, None] != cand[None, :], key, np.inf)
+
+            kk = min(k, len(cand))
+            top = np.argpartition(key, kk - 1, axis=1)[:, :kk] if kk else np.empty((len(active), 0), dtype=np.int64)
+            top_key = np.take_along_axis(key, top, axis=1)
+            if ring == full_ring or len(cand) == len(self.ids):
+                # Every venue is already a candidate; widening cannot add any
+                done = np.ones(len(active), dtype=bool)
+                needed = None
+            elif kk < k:
+                done = np.zeros(len(active), dtype=bool)
+                needed = np.full(len(active), np.inf)
+            else:
+                # Any venue closer than ring * cell_km is guaranteed to be inside
+                # the ring, and the current k-th candidate bounds the true k-th
+                # distance, so a ring that wide is always enough
+                kth = top_key.max(axis=1)
+                needed = np.full(len(active), np.inf)
+                finite = np.isfinite(kth)
+                needed[finite] = np.ceil(np.arccos(np.clip(-kth[finite], -1.0, 1.0))
+                                         * EARTH_RADIUS_KM / self.cell_km)
+                done = needed <= ring
+
+            if done.any() and kk:
+                rows = active[done]
+                found = np.isfinite(top_key[done])
+                winners = cand[top[done]]
+                # Exact distances only for the k winners; the dot product
+                # saturates below ~10 cm, so the final order comes from these
+                top_dist = np.where(found, haversine(qlat[rows, None], qlon[rows, None],
+                                                     self.lat[winners], self.lon[winners]), np.inf)
+                order = np.argsort(top_dist, axis=1, kind='stable')
+                neighbors[rows, :kk] = np.where(np.take_along_axis(found, order, axis=1),
+                                                self.ids[np.take_along_axis(winners, order, axis=1)], -1)
+                distances[rows, :kk] = np.take_along_axis(top_dist, order, axis=1)
+
+            if needed is None:
+                break
+            needed = needed[~done]
+            active = active[~done]
+            # Rows without k candidates yet double their ring; the rest jump to
+            # the ring their current k-th candidate requires
+            ring = int(np.where(np.isfinite(needed), needed, ring * 2).max()) if len(active) else ring
+        return neighbors, distances
+
+    def nearest(self, lat: float, lon: float, k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """k nearest venues to a point as (input positions, distances in km)"""
+        cx, cy = self._cell_coords(lat, lon)
+        neighbors, distances = self._knn_block(np.array([lat], dtype=float), np.array([lon], dtype=float),
+                                               int(cx) - self._cx0, int(cy) - self._cy0, k)
+        keep = neighbors[0] >= 0
+        return neighbors[0][keep], distances[0][keep]
+
+    def nearest_competitors(self, k: int = 5, same_cuisine: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """k nearest other venues for every indexed venue.
+
+        Returns (n, k) arrays of input positions and distances in km, aligned
+        with self.ids and padded with -1 / inf when fewer competitors exist.
+
+        This is a batch pass, not a per-request one: the scraped catalog takes
+        a few milliseconds, but 56k venues spread over the city (100x the
+        catalog) take about 0.7 s with k=3, and several seconds if most of
+        them crowd into a few cells of a 1 km grid. Single-point lookups
+        (nearest, query_radius) stay in milliseconds at that size.
+        """
+        if same_cuisine:
+            return self._nearest_same_cuisine(k)
+        neighbors = np.full((len(self.ids), k), -1, dtype=np.int64)
+        distances = np.full((len(self.ids), k), np.inf)
+        for members, cx, cy in self._occupied_cells():
+            block_neighbors, block_distances = self._knn_block(
+                self.lat[members], self.lon[members], cx, cy, k, members=members)
+            neighbors[members] = block_neighbors
+            distances[members] = block_distances
+        return neighbors, distances
+
+    def _nearest_same_cuisine(self, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """nearest_competitors(same_cuisine=True), searched one cuisine at a time.
+
+        Filtering a shared grid by cuisine makes venues of rare cuisines scan
+        most of the catalog, so each cuisine gets its own grid, with cells
+        sized for about CUISINE_CELL_VENUES of its venues. The per-cuisine
+        results are merged in one vectorized pass.
+        """
+        venue_rows, found, found_distances = [], [], []
+        for j in range(len(self.cuisine_names)):
+            venues = np.flatnonzero(self.cuisine_matrix[:, j])
+            if len(venues) < 2:
+                continue
+            lat, lon = self.lat[venues], self.lon[venues]
+            if len(venues) <= BRUTE_FORCE_VENUES:
+                # Comparing every pair is cheaper than building a grid
+                sub_distances = haversine(lat[:, None], lon[:, None], lat, lon)
+                np.fill_diagonal(sub_distances, np.inf)
+                sub_neighbors = np.argsort(sub_distances, axis=1, kind='stable')[:, :k]
+                sub_distances = np.take_along_axis(sub_distances, sub_neighbors, axis=1)
+            else:
+                sub = GeoIndex(lat, lon, cell_km=self._fitted_cell_km(lat, lon))
+                sub_neighbors, sub_distances = sub.nearest_competitors(k, same_cuisine=False)
+            hit = np.isfinite(sub_distances) & (sub_neighbors >= 0)
+            venue_rows.append(np.broadcast_to(venues[:, None], hit.shape)[hit])
+            found.append(venues[sub_neighbors[hit]])
+            found_distances.append(sub_distances[hit])
+
+        neighbors = np.full((len(self.ids), k), -1, dtype=np.int64)
+        distances = np.full((len(self.ids), k), np.inf)
+        if not venue_rows:
+            return neighbors, distances
+        rows, found, found_distances = (np.concatenate(a) for a in (venue_rows, found, found_distances))
+
+        # A competitor sharing several cuisines with a venue is found once per
+        # cuisine; keep one copy of each (venue, competitor) pair
+        order = np.lexsort((found, rows))
+        rows, found, found_distances = rows[order], found[order], found_distances[order]
+        first = np.ones(len(rows), dtype=bool)
+        first[1:] = (rows[1:] != rows[:-1]) | (found[1:] != found[:-1])
+        rows, found, found_distances = rows[first], found[first], found_distances[first]
+
+        # Group by venue, nearest first, and rank competitors within each group
+        order = np.lexsort((found_distances, rows))
+        rows, found, found_distances = rows[order], found[order], found_distances[order]
+        starts = np.flatnonzero(np.concatenate(([True], rows[1:] != rows[:-1])))
+        rank = np.arange(len(rows)) - np.repeat(starts, np.diff(np.append(starts, len(rows))))
+        keep = rank < k
+        neighbors[rows[keep], rank[keep]] = self.ids[found[keep]]
+        distances[rows[keep], rank[keep]] = found_distances[keep]
+        return neighbors, distances
+
+    def _fitted_cell_km(self, lat: np.ndarray, lon: np.ndarray) -> float:
+        """Cell size putting about CUISINE_CELL_VENUES venues in each occupied cell"""
+        height = max(np.radians(lat.max() - lat.min()) * EARTH_RADIUS_KM, 0.01)
+        width = max(np.radians(lon.max() - lon.min()) * EARTH_RADIUS_KM * self._cos_ref, 0.01)
+        cell_km = np.sqrt(height * width * CUISINE_CELL_VENUES / len(lat))
+        # Venues cluster, so correct the uniform estimate by the occupancy it gives
+        for _ in range(2):
+            x = np.floor(np.radians(lon) * EARTH_RADIUS_KM * self._cos_ref / cell_km)
+            y = np.floor(np.radians(lat) * EARTH_RADIUS_KM / cell_km)
+            occupied = len(np.unique(np.stack((x, y), axis=1), axis=0))
+            cell_km *= np.sqrt(CUISINE_CELL_VENUES * occupied / len(lat))
+        return float(cell_km)
+
+    def density(self, cell_km: float = 0.5, cuisine: Optional[str] = None,
+                bounds: Tuple[Tuple[float, float], Tuple[float, float]] = BAKU_BOUNDS):
+        """2D histogram of venue counts in square cell_km bins as (counts, lat_edges, lon_edges).
+
+        Bins tile the fixed ((lat_min, lat_max), (lon_min, lon_max)) region;
+        venues outside it (usually bad geocodes) are left out.
+        """
+        (lat_min, lat_max), (lon_min, lon_max) = bounds
+        lat_step = np.degrees(cell_km / EARTH_RADIUS_KM)
+        lon_step = lat_step / np.cos(np.radians((lat_min + lat_max) / 2))
+        lat_edges = np.arange(lat_min, lat_max + lat_step, lat_step)
+        lon_edges = np.arange(lon_min, lon_max + lon_step, lon_step)
+
+        mask = self._cuisine_mask(cuisine)
+        inside = ((self.lat >= lat_min) & (self.lat <= lat_max)
+                  & (self.lon >= lon_min) & (self.lon <= lon_max))
+        if (~inside).any():
+            logger.debug(f"{int((~inside).sum())} venues outside {bounds} left out of the density grid")
+        counts, _, _ = np.histogram2d(self.lat[mask & inside], self.lon[mask & inside],
+                                      bins=[lat_edges, lon_edges])
+        return counts, lat_edges, lon_edges
+
+
+def main():
+    """Print competitive-density stats for the scraped catalog"""
+    import time
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    records = load_restaurants()
+    index = GeoIndex.from_records(records, cell_km=1.0)
+
+    start = time.perf_counter()
+    counts = index.radius_counts(1.0, same_cuisine=True)
+    neighbors, distances = index.nearest_competitors(k=3, same_cuisine=True)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    print(f"Competitive density for {len(index)} geocoded venues in {elapsed:.1f} ms")
+    print("\nMost contested venues (same-cuisine competitors within 1 km):")
+    for i in np.argsort(-counts, kind='stable')[:10]:
+        venue = records[index.ids[i]]
+        nearest = distances[i][0]
+        nearest_text = f"{nearest:.2f} km" if np.isfinite(nearest) else 'n/a'
+        print(f"  {venue['name'][:40]:40} {counts[i]:4d} competitors, nearest {nearest_text}")
+
+
+if __name__ == "__main__":
+    main()
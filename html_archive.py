@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Append-only archive of fetched HTML pages with offline re-parsing.
+
+Every page is stored as one record in a pack file:
+
+    magic 'BGP1' | flags (1 byte) | fetched_at (float64) | url length (uint16)
+    | payload length (uint32) | url | zstd payload
+
+and a sidecar `.idx` file maps each URL to the offset of its latest record,
+so lookups are a seek into a memory-mapped pack. Payloads are compressed
+with a zstd dictionary trained on the first pages of the crawl (stored in
+`.dict`); bakuguide pages share most of their markup, which is what makes
+the dictionary pay off.
+
+    python html_archive.py stats archive/bakuguide.pack
+    python html_archive.py reparse archive/bakuguide.pack --output reparsed.csv
+"""
+import argparse
+import logging
+import mmap
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Iterator, Optional, Tuple
+
+import zstandard
+
+from dataset import DEFAULT_CSV
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'BGP1'
+HEADER = struct.Struct('>4sBdHI')
+FLAG_DICTIONARY = 1
+
+COMPRESSION_LEVEL = 10
+DICTIONARY_SIZE = 112 * 1024
+# Pages collected before the dictionary is trained; earlier pages use plain zstd
+DICTIONARY_TRAINING_PAGES = 100
+
+
+class HtmlArchive:
+    """Pack file of zstd-compressed pages, opened for appending ('a') or reading ('r')"""
+
+    def __init__(self, path: str, mode: str = 'r'):
+        if mode not in ('r', 'a'):
+            raise ValueError(f"Unsupported archive mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.index_path = f"{path}.idx"
+        self.dictionary_path = f"{path}.dict"
+        self.index: Dict[str, Tuple[int, int]] = {}
+        self._training_samples: List[bytes] = []
+        self._map: Optional[mmap.mmap] = None
+
+        if mode == 'a':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            self._pack = open(path, 'ab')
+            self._index_file = open(self.index_path, 'a', encoding='utf-8')
+        else:
+            self._pack = open(path, 'rb')
+        self._load_dictionary()
+        self._load_index()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._pack.close()
+        if self.mode == 'a':
+            self._index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, url: str):
+        return url in self.index
+
+    def _load_index(self):
+        """Read the sidecar index, rebuilding it from the pack if it is missing or stale"""
+        pack_size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding='utf-8') as f:
+                for line in f:
+                    url, offset, length = line.rstrip('\n').rsplit('\t', 2)
+                    self.index[url] = (int(offset), int(length))
+        indexed_end = max((o + n for o, n in self.index.values()), default=0)
+        if indexed_end != pack_size:
+            logger.warning(f"Index for {self.path} is stale; rebuilding from the pack")
+            self.index = {url: (offset, length) for url, offset, length, _ in self._scan()}
+            if self.mode == 'a':
+                # Drop a half-written trailing record left by an interrupted crawl
+                self._pack.truncate(max((o + n for o, n in self.index.values()), default=0))
+                self._index_file.seek(0)
+                self._index_file.truncate()
+                for url, (offset, length) in self.index.items():
+                    self._index_file.write(f"{url}\t{offset}\t{length}\n")
+                self._index_file.flush()
+
+    def _load_dictionary(self):
+        self._dictionary = None
+        if os.path.exists(self.dictionary_path):
+            with open(self.dictionary_path, 'rb') as f:
+                self._dictionary = zstandard.ZstdCompressionDict(f.read())
+        self._set_codecs()
+
+    def _set_codecs(self):
+        self._plain_compressor = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL)
+        self._plain_decompressor = zstandard.ZstdDecompressor()
+        if self._dictionary is not None:
+            self._dict_compressor = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL, dict_data=self._dictionary)
+            self._dict_decompressor = zstandard.ZstdDecompressor(dict_data=self._dictionary)
+
+    def train_dictionary(self, samples: List[bytes]):
+        """Train and persist the compression dictionary from sample pages"""
+        self._dictionary = zstandard.train_dictionary(DICTIONARY_SIZE, samples)
+        with open(self.dictionary_path, 'wb') as f:
+            f.write(self._dictionary.as_bytes())
+        self._set_codecs()
+        logger.info(f"Trained {len(self._dictionary.as_bytes())} byte dictionary on {len(samples)} pages")
+
+    def append(self, url: str, html: str, fetched_at: float = None):
+        """Append a fetched page; a later record for the same URL supersedes earlier ones"""
+        raw = html.encode('utf-8')
+        if self._dictionary is None:
+            self._training_samples.append(raw)
+            if len(self._training_samples) % DICTIONARY_TRAINING_PAGES == 0:
+                try:
+                    self.train_dictionary(self._training_samples)
+                    self._training_samples = []
+                except zstandard.ZstdError as e:
+                    # Retry once more pages have been collected
+                    logger.warning(f"Could not train archive dictionary yet: {e}")
+
+        if self._dictionary is not None:
+            flags, payload = FLAG_DICTIONARY, self._dict_compressor.compress(raw)
+        else:
+            flags, payload = 0, self._plain_compressor.compress(raw)
+
+        url_bytes = url.encode('utf-8')
+        record = HEADER.pack(MAGIC, flags, fetched_at or time.time(), len(url_bytes), len(payload)) + url_bytes + payload
+        offset = self._pack.seek(0, os.SEEK_END)
+        self._pack.write(record)
+        self._pack.flush()
+        self._index_file.write(f"{url}\t{offset}\t{len(record)}\n")
+        self._index_file.flush()
+        self.index[url] = (offset, len(record))
+
+    def _view(self):
+        """Memory map of the pack, remapped if it has grown"""
+        size = os.path.getsize(self.path)
+        if not size:
+            return b''
+        if self._map is None or len(self._map) != size:
+            if self._map is not None:
+                self._map.close()
+            with open(self.path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def _decode(self, view, offset: int) -> Tuple[str, float, str, int]:
+        """(url, fetched_at, html, record length) for the record at offset"""
+        magic, flags, fetched_at, url_length, payload_length = HEADER.unpack_from(view, offset)
+        if magic != MAGIC:
+            raise ValueError(f"Corrupt archive record at offset {offset} in {self.path}")
+        start = offset + HEADER.size
+        url = view[start:start + url_length].decode('utf-8')
+        payload = view[start + url_length:start + url_length + payload_length]
+        decompressor = self._dict_decompressor if flags & FLAG_DICTIONARY else self._plain_decompressor
+        html = decompressor.decompress(payload).decode('utf-8')
+        return url, fetched_at, html, HEADER.size + url_length + payload_length
+
+    def get(self, url: str) -> Optional[str]:
+        """Latest archived HTML for a URL"""
+        if url not in self.index:
+            return None
+        return self._decode(self._view(), self.index[url][0])[2]
+
+    def _scan(self) -> Iterator[Tuple[str, int, int, str]]:
+        """Walk every record in the pack, yielding (url, offset, length, html)"""
+        view = self._view()
+        offset = 0
+        while offset + HEADER.size <= len(view):
+            _, _, _, url_length, payload_length = HEADER.unpack_from(view, offset)
+            if offset + HEADER.size + url_length + payload_length > len(view):
+                break
+            url, _, html, length = self._decode(view, offset)
+            yield url, offset, length, html
+            offset += length
+
+    def urls(self) -> List[str]:
+        return list(self.index)
+
+
+# Per-process state for parallel re-parsing
+_worker_archive: Optional[HtmlArchive] = None
+_worker_scraper = None
+
+
+def _init_worker(path: str):
+    global _worker_archive, _worker_scraper
+    from scraper import BakuGuideScraper
+
+    _worker_archive = HtmlArchive(path, 'r')
+    _worker_scraper = BakuGuideScraper()
+
+
+def _parse_archived(url: str):
+    """Parse one archived page in a worker: ('listing', data), ('detail', data) or ('other', None)"""
+    if url.startswith(_worker_scraper.LISTING_URL):
+        return 'listing', _worker_scraper.parse_listing_page(_worker_archive.get(url))
+    if _worker_scraper.DETAIL_URL_PATTERN.search(url):
+        return 'detail', _worker_scraper.parse_restaurant_detail(_worker_archive.get(url), url)
+    # robots.txt, sitemaps and anything else fetched along the way
+    return 'other', None
+
+
+def reparse(path: str, workers: int = None) -> List[Dict]:
+    """Rebuild the restaurant dataset from an archive without touching the network"""
+    from scraper import BakuGuideScraper
+
+    with HtmlArchive(path, 'r') as archive:
+        urls = archive.urls()
+
+    listing_data: Dict[str, Dict] = {}
+    details: List[Dict] = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(path,)) as pool:
+        for kind, data in pool.map(_parse_archived, urls, chunksize=16):
+            if kind == 'listing':
+                listing_data.update(data)
+            elif kind == 'detail':
+                details.append(data)
+
+    # Listing pages only supply card fields; restaurants found through the
+    # sitemap are kept even if no archived listing page links to them
+    return BakuGuideScraper().merge_listing_and_details(listing_data, details)
+
+
+def main():
+    """Inspect an archive or rebuild the CSV from it"""
+    parser = argparse.ArgumentParser(description='Raw-HTML archive tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    stats = subparsers.add_parser('stats', help='show archive size and compression ratio')
+    stats.add_argument('archive')
+
+    reparse_parser = subparsers.add_parser('reparse', help='rebuild the CSV offline from archived pages')
+    reparse_parser.add_argument('archive')
+    reparse_parser.add_argument('--output', default=DEFAULT_CSV)
+    reparse_parser.add_argument('--workers', type=int, default=None)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == 'stats':
+        with HtmlArchive(args.archive, 'r') as archive:
+            raw = sum(len(html.encode('utf-8')) for _, _, _, html in archive._scan())
+            packed = os.path.getsize(args.archive)
+        print(f"{len(archive)} pages, {raw / 1e6:.1f} MB raw -> {packed / 1e6:.1f} MB packed "
+              f"({raw / max(packed, 1):.1f}x)")
+    else:
+        from scraper import BakuGuideScraper
+
+        start = time.time()
+        restaurants = reparse(args.archive, args.workers)
+        BakuGuideScraper().save_to_csv(restaurants, args.output)
+        logger.info(f"Re-parsed {len(restaurants)} restaurants in {time.time() - start:.1f} seconds")
+
+
+if __name__ == "__main__":
+    main()
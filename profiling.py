@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Opt-in profiling of the detail-page parse path.
+
+ParseProfiler times every field extractor in
+BakuGuideScraper.parse_restaurant_detail with perf_counter_ns. The timers
+are cheap enough to leave on for a whole production crawl. A configurable
+fraction of pages is additionally run under cProfile. At the end of the
+run the sampled call graphs are written as folded stacks, which
+flamegraph.pl, speedscope and inferno all read:
+
+    _parse_restaurant_detail (scraper.py:182);find (element.py:3103);_find_all (element.py:1338) 8123
+
+Counts are microseconds.
+
+    python bakuguide.py scrape --profile --profile-sample 0.05
+    python profiling.py archive/bakuguide.pack --sample 1.0   # offline, no network
+"""
+import argparse
+import cProfile
+import logging
+import os
+import pstats
+import random
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import List, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FOLDED = 'parse_profile.folded'
+# Call paths below this many microseconds are dropped from the folded output
+MIN_STACK_US = 1
+
+
+def _frame(func: Tuple[str, int, str]) -> str:
+    filename, line, name = func
+    if filename == '~':
+        # Built-ins are reported as ('~', 0, "<method 'find' of 'str' objects>")
+        return name.replace(';', ',')
+    return f"{name} ({os.path.basename(filename)}:{line})".replace(';', ',')
+
+
+class ParseProfiler:
+    """Per-field timers plus cProfile sampling of a fraction of pages"""
+
+    def __init__(self, sample_rate: float = 0.0, seed: int = None):
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError(f"Sample rate must be between 0 and 1, got {sample_rate}")
+        self.sample_rate = sample_rate
+        self._random = random.Random(seed)
+        # field -> [calls, total ns, max ns]. Pages run under cProfile are kept
+        # apart: its overhead differs per extractor and would skew the shares.
+        self.timings: Dict[str, List[int]] = defaultdict(lambda: [0, 0, 0])
+        self.sampled_timings: Dict[str, List[int]] = defaultdict(lambda: [0, 0, 0])
+        self._active = self.timings
+        self.pages = 0
+        self.sampled_pages = 0
+        self._stats = None
+
+    @contextmanager
+    def field(self, name: str):
+        """Time one extractor"""
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            timing = self._active[name]
+            timing[0] += 1
+            timing[1] += elapsed
+            if elapsed > timing[2]:
+                timing[2] = elapsed
+
+    def page(self):
+        """Context for parsing one page; runs it under cProfile if it is sampled"""
+        self.pages += 1
+        if self.sample_rate and self._random.random() < self.sample_rate:
+            return self._profiled()
+        return nullcontext()
+
+    @contextmanager
+    def _profiled(self):
+        profile = cProfile.Profile()
+        self._active = self.sampled_timings
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._active = self.timings
+            self.sampled_pages += 1
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+
+    @staticmethod
+    def _table(timings: Dict[str, List[int]]) -> List[str]:
+        total = sum(t[1] for t in timings.values()) or 1
+        lines = [f"{'field':14} {'calls':>7} {'total ms':>10} {'mean us':>9} {'max us':>9} {'share':>6}"]
+        for name, (calls, elapsed, longest) in sorted(timings.items(), key=lambda item: -item[1][1]):
+            lines.append(f"{name:14} {calls:7} {elapsed / 1e6:10.1f} {elapsed / calls / 1e3:9.1f} "
+                         f"{longest / 1e3:9.1f} {elapsed / total:6.1%}")
+        return lines
+
+    def report(self) -> str:
+        """Table of extractor timings, slowest total first.
+
+        Only pages parsed without cProfile are counted; if every page was
+        sampled, their (skewed) timings are shown instead and flagged.
+        """
+        plain_pages = self.pages - self.sampled_pages
+        if self.timings or not self.sampled_timings:
+            lines = self._table(self.timings)
+            summary = f"{plain_pages} pages timed"
+            if self.sampled_pages:
+                summary += f"; {self.sampled_pages} pages run under cProfile are left out of the table"
+            lines.append(summary)
+        else:
+            lines = self._table(self.sampled_timings)
+            lines.append(f"All {self.sampled_pages} pages ran under cProfile; "
+                         f"per-field shares include its overhead")
+        return '\n'.join(lines)
+
+    def folded_stacks(self) -> Dict[str, int]:
+        """Aggregated 'frame;frame;frame' -> microseconds from the sampled pages.
+
+        cProfile keeps only caller -> callee edges, not whole stacks, so each
+        function's time is split across its call paths in proportion to the
+        cumulative time of the edge it was reached through.
+        """
+        if self._stats is None:
+            return {}
+        entries = self._stats.stats
+        children: Dict[Tuple, List[Tuple[Tuple, float]]] = defaultdict(list)
+        roots = []
+        for func, (_, _, _, _, callers) in entries.items():
+            for caller, (_, _, _, edge_cumulative) in callers.items():
+                children[caller].append((func, edge_cumulative))
+            if not callers:
+                roots.append(func)
+
+        stacks: Dict[str, int] = defaultdict(int)
+
+        def walk(func, path: List[str], on_path: set, cumulative: float):
+            _, _, own, total, _ = entries[func]
+            share = cumulative / total if total else 0.0
+            micros = round(own * share * 1e6)
+            if micros >= MIN_STACK_US:
+                stacks[';'.join(path)] += micros
+            for child, edge_cumulative in children.get(func, ()):
+                child_cumulative = edge_cumulative * share
+                # Recursion is folded into the first occurrence of the frame
+                if child in on_path or child_cumulative * 1e6 < MIN_STACK_US:
+                    continue
+                on_path.add(child)
+                path.append(_frame(child))
+                walk(child, path, on_path, child_cumulative)
+                path.pop()
+                on_path.discard(child)
+
+        for root in roots:
+            walk(root, [_frame(root)], {root}, entries[root][3])
+        return dict(stacks)
+
+    def write_folded(self, filename: str = DEFAULT_FOLDED) -> int:
+        """Write folded stacks for flame graph tools; returns the number of stacks"""
+        stacks = self.folded_stacks()
+        with open(filename, 'w', encoding='utf-8') as f:
+            for stack, micros in sorted(stacks.items()):
+                f.write(f"{stack} {micros}\n")
+        return len(stacks)
+
+    def finish(self, folded_filename: str = DEFAULT_FOLDED):
+        """Log the timing table and dump the sampled stacks"""
+        logger.info(f"Parse profile:\n{self.report()}")
+        if self.sampled_pages:
+            count = self.write_folded(folded_filename)
+            logger.info(f"Wrote {count} folded stacks from {self.sampled_pages} pages to {folded_filename}")
+
+
+def main():
+    """Profile parsing of every archived detail page, without touching the network"""
+    parser = argparse.ArgumentParser(description='Profile the detail-page parser over a raw-HTML archive')
+    parser.add_argument('archive')
+    parser.add_argument('--sample', type=float, default=0.1, help='fraction of pages run under cProfile')
+    parser.add_argument('--output', default=DEFAULT_FOLDED)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    from html_archive import HtmlArchive
+    from scraper import BakuGuideScraper
+
+    profiler = ParseProfiler(args.sample, args.seed)
+    scraper = BakuGuideScraper(profiler=profiler)
+    with HtmlArchive(args.archive, 'r') as archive:
+        for url in archive.urls():
+            # Listing pages, robots.txt and the like are archived too
+            if scraper.DETAIL_URL_PATTERN.search(url):
+                scraper.parse_restaurant_detail(archive.get(url), url)
+    profiler.finish(args.output)
+
+
+if __name__ == "__main__":
+    main()
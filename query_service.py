@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Local HTTP/JSON query service over the scraped restaurant catalog.
+
+Filters are answered from prebuilt bitmap indexes (Python ints, one bit per
+restaurant) so a query is a handful of bitwise ANDs instead of a scan:
+
+    GET /query?cuisine=Türk&feature=Wi-Fi&feature=Canlı musiqi&max_price=20
+    GET /query?lat=40.377&lon=49.848&radius_km=1&category=Restoranlar
+    GET /facets
+
+Repeated cuisine/category values are OR-ed, repeated features are AND-ed.
+The CSV is re-indexed automatically when a new scrape replaces it.
+"""
+import argparse
+import bisect
+import json
+import logging
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Optional, Iterable
+from urllib.parse import urlparse, parse_qs
+
+from dataset import load_restaurants, split_multi, parse_price, DEFAULT_CSV
+from geo import GeoIndex
+
+logger = logging.getLogger(__name__)
+
+
+def _key(value: str) -> str:
+    return value.strip().casefold()
+
+
+def _iter_bits(bits: int) -> Iterable[int]:
+    """Yield the positions of set bits, lowest first"""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class CatalogIndex:
+    """Bitmap and sorted indexes over a list of restaurant records"""
+
+    INVERTED_FIELDS = ('cuisine', 'features', 'category')
+
+    def __init__(self, records: List[Dict]):
+        self.records = records
+        self.all_bits = (1 << len(records)) - 1
+
+        # Inverted indexes: field -> normalized value -> bitmap of rows
+        self.inverted: Dict[str, Dict[str, int]] = {field: {} for field in self.INVERTED_FIELDS}
+        self.labels: Dict[str, Dict[str, str]] = {field: {} for field in self.INVERTED_FIELDS}
+        for i, record in enumerate(records):
+            bit = 1 << i
+            for field in self.INVERTED_FIELDS:
+                values = split_multi(record.get(field)) if field != 'category' else [record.get(field) or '']
+                for value in values:
+                    if not value.strip():
+                        continue
+                    key = _key(value)
+                    self.inverted[field][key] = self.inverted[field].get(key, 0) | bit
+                    self.labels[field].setdefault(key, value.strip())
+
+        # Sorted price index: distinct prices with cumulative "price <= p" bitmaps
+        priced = sorted((p, i) for i, p in enumerate(parse_price(r.get('avg_cost_2_people')) for r in records)
+                        if not math.isnan(p))
+        self.price_levels: List[float] = []
+        self._price_at_most: List[int] = []
+        running = 0
+        for price, i in priced:
+            running |= 1 << i
+            if self.price_levels and self.price_levels[-1] == price:
+                self._price_at_most[-1] = running
+            else:
+                self.price_levels.append(price)
+                self._price_at_most.append(running)
+
+        self.geo = GeoIndex.from_records(records)
+
+    def _price_bits(self, min_price: Optional[float], max_price: Optional[float]) -> int:
+        """Rows with a parsed price inside [min_price, max_price]"""
+        hi = len(self.price_levels) if max_price is None else bisect.bisect_right(self.price_levels, max_price)
+        lo = 0 if min_price is None else bisect.bisect_left(self.price_levels, min_price)
+        if hi <= lo:
+            return 0
+        bits = self._price_at_most[hi - 1]
+        if lo:
+            bits &= ~self._price_at_most[lo - 1]
+        return bits
+
+    def _any_of(self, field: str, values: List[str]) -> int:
+        bits = 0
+        for value in values:
+            bits |= self.inverted[field].get(_key(value), 0)
+        return bits
+
+    def match(self, cuisine: Optional[List[str]] = None, features: Optional[List[str]] = None,
+              category: Optional[List[str]] = None, min_price: Optional[float] = None,
+              max_price: Optional[float] = None, lat: Optional[float] = None,
+              lon: Optional[float] = None, radius_km: Optional[float] = None) -> int:
+        """Bitmap of rows matching every given filter"""
+        bits = self.all_bits
+        if cuisine:
+            bits &= self._any_of('cuisine', cuisine)
+        if category:
+            bits &= self._any_of('category', category)
+        for feature in features or []:
+            bits &= self.inverted['features'].get(_key(feature), 0)
+        if min_price is not None or max_price is not None:
+            bits &= self._price_bits(min_price, max_price)
+        if lat is not None and lon is not None and radius_km is not None:
+            nearby = 0
+            for i in self.geo.query_radius(lat, lon, radius_km)[0]:
+                nearby |= 1 << int(i)
+            bits &= nearby
+        return bits
+
+    def query(self, limit: int = 50, offset: int = 0, **filters) -> Dict:
+        """Run a filtered lookup and return {'count', 'results'}"""
+        bits = self.match(**filters)
+        results = []
+        for n, i in enumerate(_iter_bits(bits)):
+            if n >= offset + limit:
+                break
+            if n >= offset:
+                results.append(self.records[i])
+        return {'count': bits.bit_count(), 'results': results}
+
+    def facets(self) -> Dict[str, Dict[str, int]]:
+        """Value -> row count for every indexed field"""
+        return {field: {self.labels[field][key]: bits.bit_count() for key, bits in index.items()}
+                for field, index in self.inverted.items()}
+
+
+class CatalogService:
+    """Keeps a CatalogIndex in sync with the CSV on disk"""
+
+    def __init__(self, filename: str = DEFAULT_CSV):
+        self.filename = filename
+        self.index: Optional[CatalogIndex] = None
+        self._stamp = None
+        self._failed_stamp = None
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self) -> CatalogIndex:
+        """Rebuild the index if the CSV changed since it was last loaded.
+
+        A failed reload (CSV missing, half-written or unreadable) keeps the
+        last good index in service; it only raises if there is none yet.
+        """
+        # (mtime, size) of the file being loaded; 'missing' if it is gone
+        stamp = 'missing'
+        try:
+            stat = os.stat(self.filename)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            if stamp != self._stamp:
+                with self._lock:
+                    if stamp != self._stamp:
+                        start = time.perf_counter()
+                        index = CatalogIndex(load_restaurants(self.filename))
+                        self.index, self._stamp = index, stamp
+                        logger.info(f"Indexed {len(index.records)} restaurants from {self.filename} "
+                                    f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+        except Exception as e:
+            if self.index is None:
+                raise
+            if stamp != self._failed_stamp:
+                # Log once per bad version of the file, not on every request
+                logger.error(f"Reloading {self.filename} failed, serving the previous index: {e}")
+                self._failed_stamp = stamp
+        return self.index
+
+
+def _parse_filters(params: Dict[str, List[str]]) -> Dict:
+    """Translate query-string parameters into CatalogIndex.query keyword arguments"""
+    def number(name):
+        return float(params[name][0]) if name in params else None
+
+    return {
+        'cuisine': params.get('cuisine'),
+        'features': params.get('feature'),
+        'category': params.get('category'),
+        'min_price': number('min_price'),
+        'max_price': number('max_price'),
+        'lat': number('lat'),
+        'lon': number('lon'),
+        'radius_km': number('radius_km'),
+        'limit': int(params.get('limit', ['50'])[0]),
+        'offset': int(params.get('offset', ['0'])[0]),
+    }
+
+
+def make_handler(service: CatalogService):
+    """Build a request handler class bound to a CatalogService"""
+
+    class QueryHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, payload: Dict):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            params = parse_qs(parsed.query)
+            try:
+                index = service.refresh()
+                if parsed.path == '/query':
+                    start = time.perf_counter()
+                    result = index.query(**_parse_filters(params))
+                    result['took_ms'] = round((time.perf_counter() - start) * 1000, 3)
+                    self._send_json(200, result)
+                elif parsed.path == '/facets':
+                    self._send_json(200, index.facets())
+                else:
+                    self._send_json(404, {'error': f"Unknown endpoint {parsed.path}"})
+            except ValueError as e:
+                self._send_json(400, {'error': str(e)})
+            except Exception as e:
+                logger.exception(f"Error handling {self.path}")
+                self._send_json(500, {'error': f"Internal error: {e}"})
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return QueryHandler
+
+
+def main():
+    """Serve the catalog over HTTP"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--csv', default=DEFAULT_CSV, help='scraped restaurant CSV')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    service = CatalogService(args.csv)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    logger.info(f"Serving {args.csv} on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ This may take several minutes to complete.
 """
 import asyncio
 import time
+from dataset import DEFAULT_ARCHIVE, DEFAULT_CSV
 from scraper import BakuGuideScraper
 
 
@@ -23,13 +24,13 @@ async def main():
 
     start_time = time.time()
 
-    async with BakuGuideScraper(max_concurrent=10) as scraper:
+    async with BakuGuideScraper(max_concurrent=10, archive_path=DEFAULT_ARCHIVE) as scraper:
         # Scrape all 50 pages
         restaurants = await scraper.scrape_all_restaurants(total_pages=50)
 
         # Save to CSV
-        output_file = 'bakuguide_restaurants.csv'
-        scraper.save_to_csv(restaurants, output_file)
+        output_file = DEFAULT_CSV
+        scraper.save_to_csv(restaurants, output_file, delta_dir='deltas')
 
         elapsed_time = time.time() - start_time
 
@@ -2,11 +2,17 @@ import asyncio
 import aiohttp
 from bs4 import BeautifulSoup
 import csv
+import os
 import re
+from contextlib import nullcontext
 from typing import List, Dict
 from urllib.parse import urljoin
 import logging
 
+from dataset import DEFAULT_ARCHIVE, DEFAULT_CSV
+from sitemap import SitemapEntry, SitemapError, SitemapParser, SitemapState, iter_sitemap_file
+from snapshot_diff import write_snapshot_delta
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -14,17 +20,38 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+_NO_TIMER = nullcontext()
+
+
+def _untimed(field: str):
+    """Stand-in for ParseProfiler.field when profiling is off"""
+    return _NO_TIMER
+
 
 class BakuGuideScraper:
     """Async scraper for BakuGuide restaurant data"""
 
     BASE_URL = "https://bakuguide.com"
     LISTING_URL = f"{BASE_URL}/az/1-yemek-icmek/13-restoranlar-p"
+    ROBOTS_URL = f"{BASE_URL}/robots.txt"
+    SITEMAP_URL = f"{BASE_URL}/sitemap.xml"
+    DETAIL_URL_PATTERN = re.compile(r'/az/1-yemek-icmek/13-restoranlar/\d+')
 
-    def __init__(self, max_concurrent=10):
+    # Fields that only exist on listing cards, never on detail pages
+    CARD_ONLY_FIELDS = ('avg_cost_2_people', 'features')
+
+    def __init__(self, max_concurrent=10, archive_path: str = None, profiler=None):
         self.max_concurrent = max_concurrent
         self.semaphore = asyncio.Semaphore(max_concurrent)
         self.session = None
+        # Optional raw-HTML archive every fetched page is appended to
+        self.archive = None
+        if archive_path:
+            # zstandard is only needed when archiving
+            from html_archive import HtmlArchive
+            self.archive = HtmlArchive(archive_path, 'a')
+        # Optional profiling.ParseProfiler timing the detail-page extractors
+        self.profiler = profiler
 
     async def __aenter__(self):
         """Async context manager entry"""
@@ -36,6 +63,8 @@ class BakuGuideScraper:
         """Async context manager exit"""
         if self.session:
             await self.session.close()
+        if self.archive:
+            self.archive.close()
 
     async def fetch_page(self, url: str) -> str:
         """Fetch a page with rate limiting"""
@@ -43,7 +72,10 @@ class BakuGuideScraper:
             try:
                 async with self.session.get(url) as response:
                     response.raise_for_status()
-                    return await response.text()
+                    html = await response.text()
+                    if self.archive:
+                        self.archive.append(url, html)
+                    return html
             except Exception as e:
                 logger.error(f"Error fetching {url}: {e}")
                 return None
@@ -58,7 +90,7 @@ class BakuGuideScraper:
 
         for article in articles:
             # Find the link to restaurant detail page
-            link = article.find('a', href=re.compile(r'/az/1-yemek-icmek/13-restoranlar/\d+'))
+            link = article.find('a', href=self.DETAIL_URL_PATTERN)
             if not link or not link.get('href'):
                 continue
 
@@ -146,57 +178,71 @@ class BakuGuideScraper:
 
     def parse_restaurant_detail(self, html: str, url: str) -> Dict:
         """Extract all data from a restaurant detail page"""
-        soup = BeautifulSoup(html, 'lxml')
+        if self.profiler is None:
+            return self._parse_restaurant_detail(html, url, _untimed)
+        with self.profiler.page():
+            return self._parse_restaurant_detail(html, url, self.profiler.field)
+
+    def _parse_restaurant_detail(self, html: str, url: str, timed) -> Dict:
+        """Field extraction, with each extractor wrapped in timed(field)"""
+        with timed('soup'):
+            soup = BeautifulSoup(html, 'lxml')
         data = {'url': url}
 
         try:
             # Name
-            name_elem = soup.find('h1', class_='page_title')
-            data['name'] = name_elem.get_text(strip=True) if name_elem else ''
+            with timed('name'):
+                name_elem = soup.find('h1', class_='page_title')
+                data['name'] = name_elem.get_text(strip=True) if name_elem else ''
 
             # Address
-            address_section = soup.find('h4', string='Ünvan')
-            if address_section:
-                address_p = address_section.find_next('p')
-                data['address'] = address_p.get_text(strip=True) if address_p else ''
-            else:
-                data['address'] = ''
+            with timed('address'):
+                address_section = soup.find('h4', string='Ünvan')
+                if address_section:
+                    address_p = address_section.find_next('p')
+                    data['address'] = address_p.get_text(strip=True) if address_p else ''
+                else:
+                    data['address'] = ''
 
             # Phone numbers
-            phone_div = soup.find('div', class_='phone_numbers')
-            if phone_div:
-                phones = [a.get_text(strip=True) for a in phone_div.find_all('a')]
-                data['phones'] = '; '.join(phones)
-            else:
-                data['phones'] = ''
+            with timed('phones'):
+                phone_div = soup.find('div', class_='phone_numbers')
+                if phone_div:
+                    phones = [a.get_text(strip=True) for a in phone_div.find_all('a')]
+                    data['phones'] = '; '.join(phones)
+                else:
+                    data['phones'] = ''
 
             # Cuisine types
-            kitchen_section = soup.find('h4', string='Mətbəx növü')
-            if kitchen_section:
-                kitchen_p = kitchen_section.find_next('p', class_='place-view-kitchen')
-                if kitchen_p:
-                    cuisines = [a.get_text(strip=True) for a in kitchen_p.find_all('a')]
-                    data['cuisine'] = '; '.join(cuisines)
+            with timed('cuisine'):
+                kitchen_section = soup.find('h4', string='Mətbəx növü')
+                if kitchen_section:
+                    kitchen_p = kitchen_section.find_next('p', class_='place-view-kitchen')
+                    if kitchen_p:
+                        cuisines = [a.get_text(strip=True) for a in kitchen_p.find_all('a')]
+                        data['cuisine'] = '; '.join(cuisines)
+                    else:
+                        data['cuisine'] = ''
                 else:
                     data['cuisine'] = ''
-            else:
-                data['cuisine'] = ''
 
             # Category
-            category_section = soup.find('h4', string='Kateqoriya')
-            if category_section:
-                category_p = category_section.find_next('p')
-                data['category'] = category_p.get_text(strip=True) if category_p else ''
-            else:
-                data['category'] = ''
+            with timed('category'):
+                category_section = soup.find('h4', string='Kateqoriya')
+                if category_section:
+                    category_p = category_section.find_next('p')
+                    data['category'] = category_p.get_text(strip=True) if category_p else ''
+                else:
+                    data['category'] = ''
 
             # Working hours
-            hours_section = soup.find('h4', string='İş saatları')
-            if hours_section:
-                hours_p = hours_section.find_next('p')
-                data['working_hours'] = hours_p.get_text(strip=True) if hours_p else ''
-            else:
-                data['working_hours'] = ''
+            with timed('hours'):
+                hours_section = soup.find('h4', string='İş saatları')
+                if hours_section:
+                    hours_p = hours_section.find_next('p')
+                    data['working_hours'] = hours_p.get_text(strip=True) if hours_p else ''
+                else:
+                    data['working_hours'] = ''
 
             # Average cost for 2 people (detail page may have it too)
             # This is usually only on listing page, but check just in case
@@ -207,78 +253,82 @@ class BakuGuideScraper:
             data['features'] = ''
 
             # Description
-            desc_section = soup.find('h4', class_='panel-title', string='Məkan təsviri')
-            if desc_section:
-                text_div = desc_section.find_next('div', class_='text')
-                if text_div:
-                    data['description'] = text_div.get_text(strip=True)
+            with timed('description'):
+                desc_section = soup.find('h4', class_='panel-title', string='Məkan təsviri')
+                if desc_section:
+                    text_div = desc_section.find_next('div', class_='text')
+                    if text_div:
+                        data['description'] = text_div.get_text(strip=True)
+                    else:
+                        data['description'] = ''
                 else:
                     data['description'] = ''
-            else:
-                data['description'] = ''
 
             # Social media links
-            social_section = soup.find('h4', string='Digər əlaqə vasitələri')
-            social_links = {}
-            if social_section:
-                # Find the parent div and look for all links after the h4
-                parent_div = social_section.find_parent('div', class_='info_icon_text')
-                if parent_div:
-                    for link in parent_div.find_all('a'):
-                        href = link.get('href', '')
-                        title = link.get('title', '').lower()
-
-                        # Check both href and title for social media platforms
-                        if 'facebook' in href.lower() or 'facebook' in title:
-                            social_links['facebook'] = href
-                        elif 'instagram' in href.lower() or 'instagram' in title:
-                            social_links['instagram'] = href
-                        elif 'twitter' in href.lower() or 'twitter' in title:
-                            social_links['twitter'] = href
-                        elif 'foursquare' in title or '4sq.com' in href:
-                            social_links['foursquare'] = href
-                        elif '/cdn-cgi/l/email-protection' in href or 'mailto:' in href:
-                            # Email (might be obfuscated by CloudFlare)
-                            if 'mailto:' in href:
-                                social_links['email'] = href.replace('mailto:', '')
-                            elif title == 'facebook' and 'email-protection' in href:
-                                # This is actually an email, not facebook
-                                social_links['email'] = 'protected'
-
-            data['facebook'] = social_links.get('facebook', '')
-            data['instagram'] = social_links.get('instagram', '')
-            data['twitter'] = social_links.get('twitter', '')
-            data['foursquare'] = social_links.get('foursquare', '')
-            data['email'] = social_links.get('email', '')
+            with timed('social'):
+                social_section = soup.find('h4', string='Digər əlaqə vasitələri')
+                social_links = {}
+                if social_section:
+                    # Find the parent div and look for all links after the h4
+                    parent_div = social_section.find_parent('div', class_='info_icon_text')
+                    if parent_div:
+                        for link in parent_div.find_all('a'):
+                            href = link.get('href', '')
+                            title = link.get('title', '').lower()
+
+                            # Check both href and title for social media platforms
+                            if 'facebook' in href.lower() or 'facebook' in title:
+                                social_links['facebook'] = href
+                            elif 'instagram' in href.lower() or 'instagram' in title:
+                                social_links['instagram'] = href
+                            elif 'twitter' in href.lower() or 'twitter' in title:
+                                social_links['twitter'] = href
+                            elif 'foursquare' in title or '4sq.com' in href:
+                                social_links['foursquare'] = href
+                            elif '/cdn-cgi/l/email-protection' in href or 'mailto:' in href:
+                                # Email (might be obfuscated by CloudFlare)
+                                if 'mailto:' in href:
+                                    social_links['email'] = href.replace('mailto:', '')
+                                elif title == 'facebook' and 'email-protection' in href:
+                                    # This is actually an email, not facebook
+                                    social_links['email'] = 'protected'
+
+                data['facebook'] = social_links.get('facebook', '')
+                data['instagram'] = social_links.get('instagram', '')
+                data['twitter'] = social_links.get('twitter', '')
+                data['foursquare'] = social_links.get('foursquare', '')
+                data['email'] = social_links.get('email', '')
 
             # Map coordinates (from Google Maps iframe)
-            iframe = soup.find('iframe', src=re.compile(r'google\.com/maps'))
-            if iframe:
-                src = iframe.get('src', '')
-                # Extract center coordinates from URL
-                center_match = re.search(r'center=([-\d.]+),([-\d.]+)', src)
-                if center_match:
-                    data['latitude'] = center_match.group(1)
-                    data['longitude'] = center_match.group(2)
+            with timed('coordinates'):
+                iframe = soup.find('iframe', src=re.compile(r'google\.com/maps'))
+                if iframe:
+                    src = iframe.get('src', '')
+                    # Extract center coordinates from URL
+                    center_match = re.search(r'center=([-\d.]+),([-\d.]+)', src)
+                    if center_match:
+                        data['latitude'] = center_match.group(1)
+                        data['longitude'] = center_match.group(2)
+                    else:
+                        data['latitude'] = ''
+                        data['longitude'] = ''
                 else:
                     data['latitude'] = ''
                     data['longitude'] = ''
-            else:
-                data['latitude'] = ''
-                data['longitude'] = ''
 
             # Images
-            carousel = soup.find('div', class_='carousel-inner')
-            if carousel:
-                images = []
-                for img in carousel.find_all('img'):
-                    img_src = img.get('src', img.get('data-src', ''))
-                    if img_src and 'noimage' not in img_src:
-                        full_img_url = urljoin(self.BASE_URL, img_src)
-                        images.append(full_img_url)
-                data['images'] = '; '.join(images)
-            else:
-                data['images'] = ''
+            with timed('images'):
+                carousel = soup.find('div', class_='carousel-inner')
+                if carousel:
+                    images = []
+                    for img in carousel.find_all('img'):
+                        img_src = img.get('src', img.get('data-src', ''))
+                        if img_src and 'noimage' not in img_src:
+                            full_img_url = urljoin(self.BASE_URL, img_src)
+                            images.append(full_img_url)
+                    data['images'] = '; '.join(images)
+                else:
+                    data['images'] = ''
 
         except Exception as e:
             logger.error(f"Error parsing restaurant detail from {url}: {e}")
@@ -329,7 +379,111 @@ class BakuGuideScraper:
         tasks = [self.scrape_restaurant(url) for url in restaurant_urls]
         results = await asyncio.gather(*tasks)
 
-        # Merge listing data with detail page data
+        restaurants = self.merge_listing_and_details(listing_data, results)
+        logger.info(f"Successfully scraped {len(restaurants)} restaurants")
+
+        return restaurants
+
+    async def find_sitemaps(self) -> List[str]:
+        """Sitemap URLs advertised in robots.txt, falling back to /sitemap.xml"""
+        robots = await self.fetch_page(self.ROBOTS_URL)
+        sitemaps = []
+        for line in (robots or '').splitlines():
+            if line.lower().startswith('sitemap:'):
+                sitemaps.append(line.split(':', 1)[1].strip())
+        return sitemaps or [self.SITEMAP_URL]
+
+    async def read_sitemap(self, source: str) -> List[SitemapEntry]:
+        """Stream-parse one sitemap (URL or local file path).
+
+        Raises SitemapError rather than returning a partial list: restaurants
+        of an unreadable sitemap would otherwise look delisted.
+        """
+        try:
+            if not source.startswith(('http://', 'https://')):
+                return list(iter_sitemap_file(source))
+
+            parser = SitemapParser()
+            entries = []
+            async with self.semaphore:
+                async with self.session.get(source) as response:
+                    response.raise_for_status()
+                    async for chunk in response.content.iter_chunked(64 * 1024):
+                        entries.extend(parser.feed(chunk))
+            entries.extend(parser.close())
+            return entries
+        except Exception as e:
+            raise SitemapError(f"Error reading sitemap {source}: {e}") from e
+
+    async def discover_from_sitemap(self, source: str = None) -> Dict[str, str]:
+        """Restaurant detail URLs -> lastmod from the sitemap tree"""
+        pending = [source] if source else await self.find_sitemaps()
+        seen = set()
+        detail_urls = {}
+
+        while pending:
+            batch = [s for s in pending if s not in seen]
+            seen.update(batch)
+            pending = []
+            for parent, entries in zip(batch, await asyncio.gather(*[self.read_sitemap(s) for s in batch])):
+                for entry in entries:
+                    if entry.kind == 'sitemap':
+                        # Child sitemaps of a local fixture are relative to its directory
+                        if not parent.startswith(('http://', 'https://')) and not os.path.isabs(entry.loc):
+                            pending.append(os.path.join(os.path.dirname(parent), entry.loc))
+                        else:
+                            pending.append(entry.loc)
+                    elif self.DETAIL_URL_PATTERN.search(entry.loc):
+                        detail_urls[urljoin(self.BASE_URL, entry.loc)] = entry.lastmod
+
+        logger.info(f"Sitemap lists {len(detail_urls)} restaurant pages across {len(seen)} sitemaps")
+        if not detail_urls:
+            raise SitemapError(f"No restaurant pages found in {len(seen)} sitemaps")
+        return detail_urls
+
+    async def refresh_from_sitemap(self, previous: List[Dict], state: SitemapState, source: str = None,
+                                   total_pages: int = 50, fetch_card_fields: bool = True) -> List[Dict]:
+        """Re-scrape only the restaurants whose sitemap lastmod is newer than our last fetch.
+
+        Listing pages are fetched only when new restaurants need their
+        card-only fields; known restaurants not on a fetched listing page keep
+        them from `previous`. Restaurants no longer in the sitemap are dropped.
+        Raises SitemapError, before anything is scraped, if any sitemap in the
+        tree cannot be read.
+        """
+        sitemap = await self.discover_from_sitemap(source)
+        previous_by_url = {r['url']: r for r in previous}
+        stale = [url for url, lastmod in sitemap.items()
+                 if url not in previous_by_url or state.is_stale(url, lastmod)]
+        new_urls = [url for url in stale if url not in previous_by_url]
+        logger.info(f"{len(stale)} restaurants changed since the last fetch ({len(new_urls)} new)")
+
+        tasks = [self.scrape_restaurant(url) for url in stale]
+        results = await asyncio.gather(*tasks)
+
+        listing_data = {}
+        if fetch_card_fields and new_urls:
+            listing_data = await self.get_all_restaurant_data_from_listings(total_pages)
+        for url in stale:
+            if url in previous_by_url and url not in listing_data:
+                listing_data[url] = {field: previous_by_url[url].get(field, '') for field in self.CARD_ONLY_FIELDS}
+
+        refreshed = {r['url']: r for r in self.merge_listing_and_details(listing_data, results)}
+        for url in refreshed:
+            state.mark_fetched(url, sitemap[url])
+
+        restaurants = []
+        for url in sitemap:
+            if url in refreshed:
+                restaurants.append(refreshed[url])
+            elif url in previous_by_url:
+                restaurants.append(previous_by_url[url])
+
+        logger.info(f"Refreshed {len(refreshed)} restaurants; catalog has {len(restaurants)}")
+        return restaurants
+
+    def merge_listing_and_details(self, listing_data: Dict[str, Dict], results: List[Dict]) -> List[Dict]:
+        """Merge listing card data with detail page data"""
         restaurants = []
         for detail_data in results:
             if detail_data is not None:
@@ -342,13 +496,11 @@ class BakuGuideScraper:
                     if value or key not in merged_data:
                         merged_data[key] = value
                 restaurants.append(merged_data)
-
-        logger.info(f"Successfully scraped {len(restaurants)} restaurants")
-
         return restaurants
 
-    def save_to_csv(self, restaurants: List[Dict], filename: str = 'bakuguide_restaurants.csv'):
-        """Save restaurant data to CSV file"""
+    def save_to_csv(self, restaurants: List[Dict], filename: str = DEFAULT_CSV,
+                    delta_dir: str = None):
+        """Save restaurant data to CSV file, optionally writing a change delta against the old file"""
         if not restaurants:
             logger.warning("No restaurants to save")
             return
@@ -361,7 +513,13 @@ class BakuGuideScraper:
             'latitude', 'longitude', 'images', 'url'
         ]
 
-        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
+        if delta_dir:
+            write_snapshot_delta(filename, restaurants, fieldnames, delta_dir)
+
+        # Write to a temp file and swap it in, so readers (e.g. the query
+        # service) never see a half-written CSV
+        tmp_filename = f"{filename}.tmp"
+        with open(tmp_filename, 'w', newline='', encoding='utf-8') as csvfile:
             writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
             writer.writeheader()
 
@@ -369,18 +527,19 @@ class BakuGuideScraper:
                 # Ensure all fields exist
                 row = {field: restaurant.get(field, '') for field in fieldnames}
                 writer.writerow(row)
+        os.replace(tmp_filename, filename)
 
         logger.info(f"Saved {len(restaurants)} restaurants to {filename}")
 
 
 async def main():
     """Main function to run the scraper"""
-    async with BakuGuideScraper(max_concurrent=10) as scraper:
+    async with BakuGuideScraper(max_concurrent=10, archive_path=DEFAULT_ARCHIVE) as scraper:
         # Scrape all restaurants from all 50 pages
         restaurants = await scraper.scrape_all_restaurants(total_pages=50)
 
         # Save to CSV
-        scraper.save_to_csv(restaurants, 'bakuguide_restaurants.csv')
+        scraper.save_to_csv(restaurants, DEFAULT_CSV, delta_dir='deltas')
 
         logger.info("Scraping completed!")
 
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Sitemap-driven discovery of restaurant detail pages.
+
+Sitemaps (plain or gzipped, index or urlset) are parsed incrementally as
+chunks arrive, so even very large files are never held in memory whole.
+Each detail URL comes with its <lastmod>; SitemapState remembers the
+lastmod we last fetched so a refresh only schedules pages that changed.
+
+    python sitemap.py                       # refresh from the live sitemap
+    python sitemap.py --sitemap local.xml   # refresh from a local fixture
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import sys
+import xml.etree.ElementTree as ET
+import zlib
+from collections import namedtuple
+from typing import List, Dict, Iterator, Optional
+
+from dataset import DEFAULT_ARCHIVE, DEFAULT_CSV, DEFAULT_STATE
+
+logger = logging.getLogger(__name__)
+
+SitemapEntry = namedtuple('SitemapEntry', ['kind', 'loc', 'lastmod'])
+
+
+class SitemapError(Exception):
+    """A sitemap in the tree could not be read; its restaurants are unknown"""
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+class SitemapParser:
+    """Incremental parser for sitemap XML, transparently gunzipping .gz bodies"""
+
+    def __init__(self):
+        self._parser = ET.XMLPullParser(events=('end',))
+        self._decompressor = None
+        self._head = b''
+        self._sniffed = False
+
+    def feed(self, chunk: bytes) -> List[SitemapEntry]:
+        """Feed raw bytes; returns the entries completed so far"""
+        if not self._sniffed:
+            self._head += chunk
+            if len(self._head) < 2:
+                return []
+            chunk, self._head, self._sniffed = self._head, b'', True
+            if chunk[:2] == b'\x1f\x8b':
+                self._decompressor = zlib.decompressobj(wbits=31)
+        if self._decompressor is not None:
+            chunk = self._decompressor.decompress(chunk)
+        self._parser.feed(chunk)
+        return self._drain()
+
+    def close(self) -> List[SitemapEntry]:
+        """Flush buffered input and return the remaining entries"""
+        if self._head:
+            self._parser.feed(self._head)
+        if self._decompressor is not None:
+            self._parser.feed(self._decompressor.flush())
+        self._parser.close()
+        return self._drain()
+
+    def _drain(self) -> List[SitemapEntry]:
+        entries = []
+        for _, element in self._parser.read_events():
+            kind = _local_name(element.tag)
+            if kind not in ('url', 'sitemap'):
+                continue
+            fields = {_local_name(child.tag): (child.text or '').strip() for child in element}
+            if fields.get('loc'):
+                entries.append(SitemapEntry(kind, fields['loc'], fields.get('lastmod') or None))
+            # Drop the parsed subtree so memory stays flat on large sitemaps
+            element.clear()
+        return entries
+
+
+def iter_sitemap_file(path: str, chunk_size: int = 64 * 1024) -> Iterator[SitemapEntry]:
+    """Stream entries from a local (optionally gzipped) sitemap file"""
+    parser = SitemapParser()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+def parse_lastmod(value: Optional[str]) -> Optional[datetime.datetime]:
+    """W3C datetime from <lastmod> as an aware UTC datetime"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.astimezone(datetime.timezone.utc)
+
+
+class SitemapState:
+    """Per-URL lastmod of the version we last fetched, persisted as JSON"""
+
+    def __init__(self, filename: str = DEFAULT_STATE):
+        self.filename = filename
+        self.fetched: Dict[str, Optional[str]] = {}
+        if os.path.exists(filename):
+            with open(filename, encoding='utf-8') as f:
+                self.fetched = json.load(f)
+
+    def is_stale(self, url: str, lastmod: Optional[str]) -> bool:
+        """True if the page was never fetched or the sitemap reports a newer version"""
+        if url not in self.fetched:
+            return True
+        current, seen = parse_lastmod(lastmod), parse_lastmod(self.fetched[url])
+        if current is None:
+            # No lastmod to compare against; trust the earlier fetch
+            return False
+        return seen is None or current > seen
+
+    def mark_fetched(self, url: str, lastmod: Optional[str]):
+        self.fetched[url] = lastmod
+
+    def save(self):
+        tmp_filename = f"{self.filename}.tmp"
+        with open(tmp_filename, 'w', encoding='utf-8') as f:
+            json.dump(self.fetched, f, ensure_ascii=False, indent=0)
+        os.replace(tmp_filename, self.filename)
+
+
+async def refresh(csv_file: str, sitemap_source: Optional[str], state_file: str, fetch_card_fields: bool,
+                  archive_path: Optional[str] = None):
+    """Refresh the CSV in place from the sitemap, archiving re-fetched pages to archive_path"""
+    from dataset import load_restaurants
+    from scraper import BakuGuideScraper
+
+    previous = load_restaurants(csv_file) if os.path.exists(csv_file) else []
+    state = SitemapState(state_file)
+    async with BakuGuideScraper(max_concurrent=10, archive_path=archive_path) as scraper:
+        restaurants = await scraper.refresh_from_sitemap(previous, state, sitemap_source,
+                                                         fetch_card_fields=fetch_card_fields)
+        scraper.save_to_csv(restaurants, csv_file, delta_dir='deltas')
+    state.save()
+
+
+def main():
+    """Run a sitemap-driven refresh"""
+    parser = argparse.ArgumentParser(description='Refresh the restaurant CSV from the site sitemap')
+    parser.add_argument('--csv', default=DEFAULT_CSV)
+    parser.add_argument('--sitemap', help='sitemap URL or local file (default: from robots.txt)')
+    parser.add_argument('--state', default=DEFAULT_STATE)
+    parser.add_argument('--no-card-fields', action='store_true',
+                        help='skip listing pages even when new restaurants need cost/features')
+    parser.add_argument('--archive', default=DEFAULT_ARCHIVE, help='raw-HTML archive (default: %(default)s)')
+    parser.add_argument('--no-archive', action='store_true')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        asyncio.run(refresh(args.csv, args.sitemap, args.state, not args.no_card_fields,
+                            None if args.no_archive else args.archive))
+    except SitemapError as e:
+        logger.error(f"Refresh aborted, {args.csv} left unchanged: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Change-data-capture deltas between consecutive scrapes.
+
+The previous snapshot is streamed into a hash table of URL -> per-field
+digests (the build side); the new records are then streamed past it (the
+probe side). Only digests are held in memory, never full old rows.
+
+Deltas are JSON Lines files, one operation per line:
+
+    {"op": "meta", "added": 3, "changed": 12, "removed": 1, "base": "9f2c...", "result": "41ab...", ...}
+    {"op": "add", "url": "...", "record": {...}}
+    {"op": "change", "url": "...", "fields": {"working_hours": "10:00-23:00"}}
+    {"op": "remove", "url": "..."}
+
+`base` and `result` fingerprint the snapshots before and after the delta,
+so a consumer applying deltas in order can tell one is missing when a
+delta's base is not the previous delta's result.
+
+    python snapshot_diff.py old.csv new.csv --output deltas/manual.jsonl
+"""
+import argparse
+import csv
+import datetime
+import hashlib
+import json
+import logging
+import os
+import shutil
+from typing import List, Dict, Iterable, Iterator, Tuple
+
+from dataset import iter_restaurants
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DELTA_DIR = 'deltas'
+
+
+def _digest(value: str) -> bytes:
+    return hashlib.blake2b((value or '').encode('utf-8'), digest_size=8).digest()
+
+
+def field_digests(record: Dict, fields: List[str]) -> Tuple[bytes, ...]:
+    """Per-field digests of a record, in `fields` order"""
+    return tuple(_digest(record.get(field, '')) for field in fields)
+
+
+def snapshot_fingerprint(rows: Iterable[Dict], fields: List[str]) -> str:
+    """Order-independent digest of a whole snapshot, computed in one streaming pass"""
+    total = 0
+    for row in rows:
+        if row.get('url'):
+            row_digest = hashlib.blake2b(row['url'].encode('utf-8'), digest_size=8)
+            for digest in field_digests(row, fields):
+                row_digest.update(digest)
+            total = (total + int.from_bytes(row_digest.digest(), 'big')) % (1 << 64)
+    return f"{total:016x}"
+
+
+def build_side(rows: Iterable[Dict], fields: List[str]) -> Dict[str, Tuple[bytes, ...]]:
+    """URL -> field digests for the previous snapshot"""
+    return {row['url']: field_digests(row, fields) for row in rows if row.get('url')}
+
+
+def diff(previous: Iterable[Dict], current: Iterable[Dict], fields: List[str]) -> Iterator[Dict]:
+    """Yield add/change/remove operations turning `previous` into `current`"""
+    known = build_side(previous, fields)
+    for row in current:
+        url = row.get('url')
+        if not url:
+            continue
+        old = known.pop(url, None)
+        new = field_digests(row, fields)
+        if old is None:
+            yield {'op': 'add', 'url': url, 'record': {field: row.get(field, '') for field in fields}}
+        elif old != new:
+            changed = {field: row.get(field, '') for field, a, b in zip(fields, old, new) if a != b}
+            yield {'op': 'change', 'url': url, 'fields': changed}
+
+    # Whatever was not probed has disappeared (closed or delisted)
+    for url in known:
+        yield {'op': 'remove', 'url': url}
+
+
+def write_delta(operations: Iterable[Dict], filename: str, **meta) -> Dict[str, int]:
+    """Write operations as JSON Lines behind a meta header; returns the op counts.
+
+    Operations are streamed to a temp file while they are counted, then
+    copied in behind the header. Nothing is written when there are no changes,
+    and an existing file is never overwritten.
+    """
+    counts = {'added': 0, 'changed': 0, 'removed': 0}
+    os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+    tmp_filename = f"{filename}.ops.tmp"
+    try:
+        with open(tmp_filename, 'w', encoding='utf-8') as ops:
+            for operation in operations:
+                counts[{'add': 'added', 'change': 'changed', 'remove': 'removed'}[operation['op']]] += 1
+                ops.write(json.dumps(operation, ensure_ascii=False) + '\n')
+        if any(counts.values()):
+            with open(filename, 'x', encoding='utf-8') as f, open(tmp_filename, encoding='utf-8') as ops:
+                f.write(json.dumps({'op': 'meta', **counts, **meta}, ensure_ascii=False) + '\n')
+                shutil.copyfileobj(ops, f)
+    finally:
+        os.remove(tmp_filename)
+    return counts
+
+
+def delta_filename(delta_dir: str = DEFAULT_DELTA_DIR) -> str:
+    """Timestamped path for a new delta file; names sort in creation order"""
+    # Microseconds, so two saves within the same second get separate files
+    stamp = datetime.datetime.now().strftime('%Y%m%dT%H%M%S%f')
+    return os.path.join(delta_dir, f"delta-{stamp}.jsonl")
+
+
+def write_snapshot_delta(previous_csv: str, restaurants: List[Dict], fields: List[str],
+                         delta_dir: str = DEFAULT_DELTA_DIR):
+    """Diff freshly scraped records against the CSV they are about to replace"""
+    if not os.path.exists(previous_csv):
+        logger.info(f"No previous snapshot at {previous_csv}; skipping delta")
+        return None
+    filename = delta_filename(delta_dir)
+    counts = write_delta(diff(iter_restaurants(previous_csv), restaurants, fields), filename,
+                         created=datetime.datetime.now().isoformat(timespec='seconds'),
+                         base=snapshot_fingerprint(iter_restaurants(previous_csv), fields),
+                         result=snapshot_fingerprint(restaurants, fields))
+    if any(counts.values()):
+        logger.info(f"Wrote delta {filename}: {counts['added']} added, "
+                    f"{counts['changed']} changed, {counts['removed']} removed")
+        return filename
+    logger.info("No changes since the previous snapshot")
+    return None
+
+
+def apply_delta(records: Dict[str, Dict], filename: str) -> Dict[str, Dict]:
+    """Apply a delta file to a URL -> record mapping in place and return it"""
+    with open(filename, encoding='utf-8') as f:
+        for line in f:
+            operation = json.loads(line)
+            if operation['op'] == 'add':
+                records[operation['url']] = operation['record']
+            elif operation['op'] == 'change':
+                records.setdefault(operation['url'], {'url': operation['url']}).update(operation['fields'])
+            elif operation['op'] == 'remove':
+                records.pop(operation['url'], None)
+    return records
+
+
+def main():
+    """Diff two CSV snapshots"""
+    parser = argparse.ArgumentParser(description='Write a change delta between two scraped CSVs')
+    parser.add_argument('previous')
+    parser.add_argument('current')
+    parser.add_argument('--output', help='delta file (default: deltas/delta-<timestamp>.jsonl)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    with open(args.current, newline='', encoding='utf-8') as f:
+        fields = next(csv.reader(f))
+    output = args.output or delta_filename()
+    try:
+        counts = write_delta(diff(iter_restaurants(args.previous), iter_restaurants(args.current), fields), output,
+                             base=snapshot_fingerprint(iter_restaurants(args.previous), fields),
+                             result=snapshot_fingerprint(iter_restaurants(args.current), fields))
+    except FileExistsError:
+        parser.error(f"{output} already exists")
+    print(f"{counts['added']} added, {counts['changed']} changed, {counts['removed']} removed -> {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+
+import bakuguide
+
+CLI = os.path.abspath(bakuguide.__file__)
+
+
+def run_cli(*args, cwd=None):
+    return subprocess.run([sys.executable, CLI, *args], cwd=cwd, capture_output=True, text=True)
+
+
+def test_help_imports_no_heavy_modules():
+    probe = subprocess.run(
+        [sys.executable, '-c',
+         f"import runpy, sys; sys.argv = ['bakuguide', 'stats', '--help']\n"
+         f"try:\n    runpy.run_path({CLI!r}, run_name='__main__')\nexcept SystemExit:\n    pass\n"
+         f"print(' '.join(sorted(sys.modules)))"],
+        capture_output=True, text=True, check=True)
+    loaded = set(probe.stdout.split())
+    assert loaded.isdisjoint(bakuguide.HEAVY_MODULES)
+
+
+def test_startup_within_budget():
+    result = run_cli('startup-check')
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert result.stdout.rstrip().endswith('OK')
+
+
+def test_stats_without_any_data(tmp_path):
+    result = run_cli('stats', cwd=tmp_path)
+    assert result.returncode == 0, result.stderr
+    assert 'missing' in result.stdout
+    assert 'never refreshed' in result.stdout
@@ -0,0 +1,39 @@
+from dedupe import find_duplicates, normalize_name
+
+
+def record(url, name, address, phones, lat, lon):
+    return {'url': url, 'name': name, 'address': address, 'phones': phones,
+            'latitude': lat, 'longitude': lon}
+
+
+SCALINI = [
+    record('135', '"Scalini" Ristorante Italiano', 'Bakıxanov küçəsi, 2',
+           '012 5982850; 012 5962090; 055 2317777', '40.3863219', '49.825427'),
+    record('361', '"Scalini" Ristorante Italiano', 'Bakixanov küç., 2', '012 5982850',
+           '40.386322', '49.825427'),
+]
+# Different franchise brands sharing an operator's phone on the same avenue
+FRANCHISES = [
+    record('209', 'Cinnabon Azerbaijan', 'İnşaatçılar pr., 38', '012 4368791; 012 4369001',
+           '40.383885', '49.823363'),
+    record('362', 'Schlotzsky’s Azerbaijan', 'İnşaatçilar pr., 11', '012 4368791; 050 2292019',
+           '40.3829389', '49.8214892'),
+]
+
+
+def test_country_words_are_generic():
+    assert normalize_name('Cinnabon Azerbaijan') == 'cinnabon'
+    assert normalize_name('Bakı') == 'baki'
+
+
+def test_same_venue_listed_twice():
+    assert find_duplicates(SCALINI) == [[0, 1]]
+
+
+def test_franchises_sharing_a_phone_are_kept_apart():
+    assert find_duplicates(FRANCHISES) == []
+
+
+def test_conflicting_house_numbers_veto_a_match():
+    branch = dict(SCALINI[1], address='Bakixanov küç., 40')
+    assert find_duplicates([SCALINI[0], branch]) == []
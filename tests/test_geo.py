@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from geo import BRUTE_FORCE_VENUES, GeoIndex, haversine
+
+
+def catalog(n=1200, seed=0):
+    """Random venues around Baku with missing coordinates, an outlier and rare cuisines"""
+    rng = np.random.default_rng(seed)
+    lat = 40.35 + rng.random(n) * 0.1
+    lon = 49.8 + rng.random(n) * 0.15
+    lat[::40] = np.nan
+    # A venue far out on the peninsula forces the widest ring searches
+    lat[1], lon[1] = 40.6, 50.35
+    cuisines = [[c for c in 'ABC' if rng.random() < 0.35] for _ in range(n)]
+    cuisines[1] = ['A', 'Rare']
+    cuisines[7] = ['Rare']
+    cuisines[11] = ['Unique']
+    return lat, lon, cuisines
+
+
+def brute_force(index):
+    """All-pairs distances and shared-cuisine matrix over the indexed venues"""
+    distances = haversine(index.lat[:, None], index.lon[:, None], index.lat, index.lon)
+    np.fill_diagonal(distances, np.inf)
+    weights = index.cuisine_matrix.astype(int)
+    return distances, (weights @ weights.T) > 0
+
+
+def as_finite(values):
+    return np.where(np.isfinite(values), values, -1.0)
+
+
+@pytest.mark.parametrize('cell_km', [0.3, 2.0])
+@pytest.mark.parametrize('same_cuisine', [False, True])
+def test_nearest_competitors_match_brute_force(cell_km, same_cuisine):
+    lat, lon, cuisines = catalog()
+    index = GeoIndex(lat, lon, cuisines, cell_km=cell_km)
+    distances, shared = brute_force(index)
+    if same_cuisine:
+        distances = np.where(shared, distances, np.inf)
+        # Both the grid and the pairwise path of the same-cuisine search run
+        sizes = index.cuisine_matrix.sum(axis=0)
+        assert sizes.max() > BRUTE_FORCE_VENUES >= sizes.min()
+
+    k = 4
+    neighbors, found = index.nearest_competitors(k, same_cuisine=same_cuisine)
+    expected = np.sort(distances, axis=1)[:, :k]
+    np.testing.assert_allclose(as_finite(found), as_finite(expected), atol=1e-9)
+    # Neighbors are real positions whose distance is the reported one
+    hit = neighbors >= 0
+    assert (hit == np.isfinite(found)).all()
+    positions = np.searchsorted(index.ids, neighbors[hit])
+    rows = np.nonzero(hit)[0]
+    np.testing.assert_allclose(distances[rows, positions], found[hit], atol=1e-9)
+    assert (index.ids[rows] != neighbors[hit]).all()
+
+
+def test_competitor_searches_end_at_the_catalog_edge():
+    lat, lon, cuisines = catalog()
+    index = GeoIndex(lat, lon, cuisines, cell_km=0.3)
+    row = {venue: i for i, venue in enumerate(index.ids)}
+
+    neighbors, distances = index.nearest_competitors(3, same_cuisine=True)
+    # The outlier's only 'Rare' peer is far away, but 'A' venues are nearer
+    assert np.isfinite(distances[row[1]]).all()
+    # 7 only shares 'Rare' with the outlier: one competitor, then padding
+    assert list(neighbors[row[7]]) == [1, -1, -1]
+    assert np.isinf(distances[row[7], 1:]).all()
+    # A cuisine nobody else serves has no competitors at all
+    assert list(neighbors[row[11]]) == [-1, -1, -1]
+
+
+def test_radius_counts_match_brute_force():
+    lat, lon, cuisines = catalog()
+    index = GeoIndex(lat, lon, cuisines, cell_km=0.5)
+    distances, shared = brute_force(index)
+
+    near = distances <= 1.2
+    assert (index.radius_counts(1.2) == near.sum(axis=1)).all()
+    assert (index.radius_counts(1.2, same_cuisine=True) == (near & shared).sum(axis=1)).all()
+    serves_b = index._cuisine_mask('B')
+    assert (index.radius_counts(1.2, cuisine='B') == (near & serves_b[None, :]).sum(axis=1)).all()
+
+
+def test_point_queries_match_brute_force():
+    lat, lon, cuisines = catalog()
+    index = GeoIndex(lat, lon, cuisines, cell_km=0.5)
+    point = (40.4, 49.87)
+    distances = haversine(*point, lat, lon)
+
+    found, found_distances = index.query_radius(*point, 2.0)
+    assert set(found) == set(np.flatnonzero(distances <= 2.0))
+    assert (np.diff(found_distances) >= 0).all()
+
+    found, _ = index.query_radius(*point, 2.0, cuisine='C')
+    serves_c = np.array(['C' in c for c in cuisines])
+    assert set(found) == set(np.flatnonzero((distances <= 2.0) & serves_c))
+
+    found, found_distances = index.nearest(*point, k=5)
+    np.testing.assert_allclose(found_distances, np.sort(distances[np.isfinite(distances)])[:5])
+    np.testing.assert_allclose(distances[found], found_distances)
+
+    # Far outside the grid the search widens until it reaches the outlier
+    _, found_distances = index.nearest(40.7, 50.4, k=1)
+    assert found_distances[0] == pytest.approx(haversine(40.7, 50.4, 40.6, 50.35))
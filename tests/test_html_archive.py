@@ -0,0 +1,48 @@
+import os
+
+from html_archive import HtmlArchive, reparse
+from scraper import BakuGuideScraper
+
+DETAIL = 'https://bakuguide.com/az/1-yemek-icmek/13-restoranlar/'
+LISTED, SITEMAP_ONLY, TORN = (DETAIL + slug for slug in ('1-listed', '2-sitemap-only', '3-torn'))
+
+LISTING_HTML = f"""<html><body>
+<article class="card"><a href="{LISTED}">Listed</a>
+  <div class="row"><div class="col-lg-3">2 nəfərə orta xərc</div><div class="col-lg-9">30 M</div></div>
+  <div class="row"><div class="col-lg-3">Xüsusiyyətləri</div><div class="col-lg-9"><a>Wi-Fi</a></div></div>
+</article>
+</body></html>"""
+
+
+def detail_html(name):
+    return f'<html><body><h1 class="page_title">{name}</h1></body></html>'
+
+
+def test_torn_tail_is_dropped_and_archive_reparses(tmp_path):
+    path = str(tmp_path / 'bakuguide.pack')
+    with HtmlArchive(path, 'a') as archive:
+        archive.append(BakuGuideScraper.ROBOTS_URL, 'User-agent: *\nSitemap: https://bakuguide.com/sitemap.xml\n')
+        archive.append(f"{BakuGuideScraper.LISTING_URL}1", LISTING_HTML)
+        archive.append(LISTED, detail_html('Listed'))
+        archive.append(SITEMAP_ONLY, detail_html('Sitemap only'))
+        intact = os.path.getsize(path)
+        archive.append(TORN, detail_html('Torn'))
+
+    # A crawl killed mid-write leaves half a record behind, still in the index
+    with open(path, 'r+b') as f:
+        f.truncate(intact + 10)
+
+    with HtmlArchive(path, 'a') as archive:
+        assert TORN not in archive
+        assert len(archive) == 4
+    assert os.path.getsize(path) == intact
+    with HtmlArchive(path, 'r') as archive:
+        assert archive.get(SITEMAP_ONLY) == detail_html('Sitemap only')
+
+    restaurants = {r['url']: r for r in reparse(path, workers=1)}
+    # robots.txt is archived but is not a restaurant
+    assert set(restaurants) == {LISTED, SITEMAP_ONLY}
+    assert restaurants[LISTED]['name'] == 'Listed'
+    assert restaurants[LISTED]['avg_cost_2_people'] == '30'
+    assert restaurants[LISTED]['features'] == 'Wi-Fi'
+    assert restaurants[SITEMAP_ONLY]['name'] == 'Sitemap only'
@@ -0,0 +1,116 @@
+import os
+
+import pytest
+
+from query_service import CatalogIndex, CatalogService
+from scraper import BakuGuideScraper
+
+
+def record(name, price, cuisine='', features='', category='Restoranlar'):
+    return {'name': name, 'url': f"https://bakuguide.com/{name}", 'avg_cost_2_people': price,
+            'cuisine': cuisine, 'features': features, 'category': category}
+
+
+RECORDS = [
+    record('cheap', '10', 'Türk', 'Wi-Fi'),
+    record('mid', '20', 'Türk; Avropa', 'Wi-Fi; Canlı musiqi'),
+    record('same-price', '20', 'Yapon', 'Canlı musiqi'),
+    record('range', '30-50', 'Avropa', 'Wi-Fi; Canlı musiqi', 'Kafelər'),
+    record('unpriced', '', 'Türk', 'Wi-Fi'),
+]
+
+
+def names(index, bits):
+    return {index.records[i]['name'] for i in range(len(index.records)) if bits >> i & 1}
+
+
+@pytest.fixture
+def index():
+    return CatalogIndex(RECORDS)
+
+
+def test_price_levels_merge_duplicates(index):
+    assert index.price_levels == [10.0, 20.0, 40.0]
+
+
+@pytest.mark.parametrize('min_price, max_price, expected', [
+    (None, None, {'cheap', 'mid', 'same-price', 'range'}),
+    (10, 10, {'cheap'}),
+    (None, 10, {'cheap'}),
+    (40, None, {'range'}),
+    (20, 20, {'mid', 'same-price'}),
+    (10.5, 39.9, {'mid', 'same-price'}),
+    (None, 9.99, set()),
+    (40.01, None, set()),
+    (30, 15, set()),
+])
+def test_price_bits_boundaries(index, min_price, max_price, expected):
+    assert names(index, index._price_bits(min_price, max_price)) == expected
+
+
+def test_values_within_a_field_are_ored(index):
+    assert names(index, index.match(cuisine=['Yapon', 'avropa'])) == {'mid', 'same-price', 'range'}
+    assert names(index, index.match(category=['Kafelər', 'Restoranlar'])) == {r['name'] for r in RECORDS}
+
+
+def test_features_and_fields_are_anded(index):
+    assert names(index, index.match(features=['Wi-Fi', 'Canlı musiqi'])) == {'mid', 'range'}
+    assert names(index, index.match(cuisine=['Türk'], features=['wi-fi'], max_price=15)) == {'cheap'}
+    assert names(index, index.match(cuisine=['Türk', 'Yapon'], features=['Canlı musiqi'],
+                                    category=['Restoranlar'])) == {'mid', 'same-price'}
+    assert index.match(features=['Wi-Fi', 'Terras']) == 0
+
+
+def test_query_pages_in_row_order(index):
+    result = index.query(features=['Wi-Fi'], limit=2, offset=1)
+    assert result['count'] == 4
+    assert [r['name'] for r in result['results']] == ['mid', 'range']
+
+
+@pytest.fixture
+def catalog_csv(tmp_path):
+    filename = str(tmp_path / 'restaurants.csv')
+    BakuGuideScraper().save_to_csv(RECORDS, filename)
+    return filename
+
+
+def bump_mtime(filename, seconds=1):
+    """Make sure the (mtime, size) stamp changes even on coarse clocks"""
+    stat = os.stat(filename)
+    os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 10 ** 9))
+
+
+def test_refresh_reloads_a_replaced_csv(catalog_csv):
+    service = CatalogService(catalog_csv)
+    BakuGuideScraper().save_to_csv(RECORDS[:2], catalog_csv)
+    bump_mtime(catalog_csv)
+    assert len(service.refresh().records) == 2
+
+
+def test_refresh_keeps_last_good_index_when_csv_disappears(catalog_csv):
+    service = CatalogService(catalog_csv)
+    good = service.index
+    os.remove(catalog_csv)
+    assert service.refresh() is good
+    assert service.refresh().query(cuisine=['Türk'])['count'] == 3
+
+
+def test_refresh_keeps_last_good_index_when_csv_is_corrupt(catalog_csv, caplog):
+    service = CatalogService(catalog_csv)
+    good = service.index
+    with open(catalog_csv, 'wb') as f:
+        f.write(b'name,url\n\xff\xfe not utf-8,x\n')
+    bump_mtime(catalog_csv)
+    assert service.refresh() is good
+    assert service.refresh() is good
+    # Logged once per bad version of the file, not on every request
+    assert len([r for r in caplog.records if 'Reloading' in r.getMessage()]) == 1
+
+    BakuGuideScraper().save_to_csv(RECORDS[:1], catalog_csv)
+    bump_mtime(catalog_csv, seconds=2)
+    assert len(service.refresh().records) == 1
+
+
+def test_first_load_failure_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        CatalogService(str(tmp_path / 'missing.csv'))
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import os
+import shutil
+
+import pytest
+
+from dataset import load_restaurants
+from scraper import BakuGuideScraper
+from sitemap import SitemapError, SitemapState, refresh
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'sitemap')
+INDEX = os.path.join(FIXTURES, 'sitemap_index.xml')
+DETAIL = 'https://bakuguide.com/az/1-yemek-icmek/13-restoranlar/'
+UNCHANGED, UPDATED, GONE, NEW = (DETAIL + slug for slug in ('1-unchanged', '2-updated', '3-gone', '4-new'))
+
+
+def previous_record(url, **fields):
+    return dict({'url': url, 'name': url.rsplit('-', 1)[-1], 'avg_cost_2_people': '10', 'features': 'Wi-Fi'},
+                **fields)
+
+
+@pytest.fixture
+def scraped(monkeypatch):
+    """Stub out all network access; returns the detail URLs that got scraped"""
+    calls = []
+
+    async def scrape_restaurant(self, url):
+        calls.append(url)
+        return {'url': url, 'name': f"{url.rsplit('-', 1)[-1]} (fresh)", 'working_hours': '10:00-23:00'}
+
+    async def listings(self, total_pages=50):
+        return {UPDATED: {'avg_cost_2_people': '25', 'features': 'Wi-Fi; Canlı musiqi'},
+                NEW: {'avg_cost_2_people': '15', 'features': 'Terras'}}
+
+    monkeypatch.setattr(BakuGuideScraper, 'scrape_restaurant', scrape_restaurant)
+    monkeypatch.setattr(BakuGuideScraper, 'get_all_restaurant_data_from_listings', listings)
+    return calls
+
+
+def test_discover_reads_index_and_gzipped_child():
+    discovered = asyncio.run(BakuGuideScraper().discover_from_sitemap(INDEX))
+    assert discovered == {
+        UNCHANGED: '2024-04-01T10:00:00+04:00',
+        UPDATED: '2024-05-02T09:30:00+04:00',
+        NEW: '2024-05-03',
+    }
+
+
+def test_refresh_schedules_only_stale_urls(tmp_path, monkeypatch, scraped):
+    monkeypatch.chdir(tmp_path)
+    csv_file, state_file = 'restaurants.csv', 'state.json'
+    BakuGuideScraper().save_to_csv([previous_record(UNCHANGED), previous_record(UPDATED),
+                                    previous_record(GONE)], csv_file)
+    state = SitemapState(state_file)
+    state.mark_fetched(UNCHANGED, '2024-04-01T10:00:00+04:00')
+    state.mark_fetched(UPDATED, '2024-04-20')
+    state.mark_fetched(GONE, '2024-04-20')
+    state.save()
+
+    asyncio.run(refresh(csv_file, INDEX, state_file, fetch_card_fields=True))
+
+    assert sorted(scraped) == sorted([UPDATED, NEW])
+    restaurants = {r['url']: r for r in load_restaurants(csv_file)}
+    assert set(restaurants) == {UNCHANGED, UPDATED, NEW}
+    assert restaurants[UNCHANGED]['name'] == 'unchanged'
+    assert restaurants[UPDATED]['name'] == 'updated (fresh)'
+    # Card fields come from the freshly fetched listing, not the previous CSV
+    assert restaurants[UPDATED]['avg_cost_2_people'] == '25'
+    assert restaurants[NEW]['features'] == 'Terras'
+
+    with open(state_file, encoding='utf-8') as f:
+        saved = json.load(f)
+    assert saved[UPDATED] == '2024-05-02T09:30:00+04:00'
+    assert saved[NEW] == '2024-05-03'
+    assert saved[UNCHANGED] == '2024-04-01T10:00:00+04:00'
+
+    # Nothing is stale on the next run
+    scraped.clear()
+    asyncio.run(refresh(csv_file, INDEX, state_file, fetch_card_fields=True))
+    assert scraped == []
+
+
+def test_unreadable_child_sitemap_aborts_refresh(tmp_path, monkeypatch, scraped):
+    fixtures = tmp_path / 'fixtures'
+    shutil.copytree(FIXTURES, fixtures)
+    os.remove(fixtures / 'restaurants-2.xml.gz')
+    monkeypatch.chdir(tmp_path)
+    BakuGuideScraper().save_to_csv([previous_record(UNCHANGED), previous_record(NEW)], 'restaurants.csv')
+    before = (tmp_path / 'restaurants.csv').read_bytes()
+
+    with pytest.raises(SitemapError):
+        asyncio.run(refresh('restaurants.csv', str(fixtures / 'sitemap_index.xml'), 'state.json',
+                            fetch_card_fields=True))
+
+    assert scraped == []
+    assert (tmp_path / 'restaurants.csv').read_bytes() == before
+    assert not (tmp_path / 'state.json').exists()
@@ -0,0 +1,77 @@
+import csv
+import json
+
+import pytest
+
+from scraper import BakuGuideScraper
+from snapshot_diff import apply_delta, diff, snapshot_fingerprint, write_delta
+
+FIELDS = ['name', 'working_hours', 'url']
+OLD = [
+    {'name': 'Kept', 'working_hours': '10:00-23:00', 'url': 'u1'},
+    {'name': 'Changed', 'working_hours': '10:00-23:00', 'url': 'u2'},
+    {'name': 'Closed', 'working_hours': '09:00-18:00', 'url': 'u3'},
+]
+NEW = [
+    {'name': 'Kept', 'working_hours': '10:00-23:00', 'url': 'u1'},
+    {'name': 'Changed', 'working_hours': '12:00-02:00', 'url': 'u2'},
+    {'name': 'Opened', 'working_hours': '24/7', 'url': 'u4'},
+]
+
+
+def read_delta(filename):
+    with open(filename, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def csv_fields(filename):
+    with open(filename, newline='', encoding='utf-8') as f:
+        return next(csv.reader(f))
+
+
+def test_applying_the_diff_reproduces_the_new_snapshot(tmp_path):
+    filename = str(tmp_path / 'delta.jsonl')
+    counts = write_delta(diff(OLD, NEW, FIELDS), filename)
+
+    assert counts == {'added': 1, 'changed': 1, 'removed': 1}
+    operations = read_delta(filename)
+    assert operations[0]['op'] == 'meta'
+    assert {'op': 'change', 'url': 'u2', 'fields': {'working_hours': '12:00-02:00'}} in operations
+    records = apply_delta({r['url']: dict(r) for r in OLD}, filename)
+    assert records == {r['url']: r for r in NEW}
+
+
+def test_no_changes_writes_nothing(tmp_path):
+    filename = tmp_path / 'delta.jsonl'
+    assert write_delta(diff(OLD, OLD, FIELDS), str(filename)) == {'added': 0, 'changed': 0, 'removed': 0}
+    assert not filename.exists()
+
+
+def test_deltas_in_the_same_second_are_all_kept_and_chained(tmp_path):
+    csv_file, delta_dir = str(tmp_path / 'restaurants.csv'), str(tmp_path / 'deltas')
+    scraper = BakuGuideScraper()
+    scraper.save_to_csv(OLD, csv_file)
+    snapshots = [NEW, OLD, NEW]
+    for snapshot in snapshots:
+        scraper.save_to_csv(snapshot, csv_file, delta_dir=delta_dir)
+
+    deltas = sorted((tmp_path / 'deltas').iterdir())
+    assert len(deltas) == len(snapshots)
+    headers = [read_delta(delta)[0] for delta in deltas]
+    assert headers[0]['base'] == snapshot_fingerprint(OLD, csv_fields(csv_file))
+    for previous, following in zip(headers, headers[1:]):
+        assert following['base'] == previous['result']
+
+
+def test_existing_delta_is_never_overwritten(tmp_path):
+    filename = tmp_path / 'delta.jsonl'
+    filename.write_text('keep me\n', encoding='utf-8')
+    with pytest.raises(FileExistsError):
+        write_delta(diff(OLD, NEW, FIELDS), str(filename))
+    assert filename.read_text(encoding='utf-8') == 'keep me\n'
+    assert list(tmp_path.iterdir()) == [filename]
+
+
+def test_fingerprint_ignores_row_order():
+    assert snapshot_fingerprint(OLD, FIELDS) == snapshot_fingerprint(OLD[::-1], FIELDS)
+    assert snapshot_fingerprint(OLD, FIELDS) != snapshot_fingerprint(NEW, FIELDS)
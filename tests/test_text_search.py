@@ -0,0 +1,101 @@
+import pytest
+
+from dataset import normalize
+from text_search import SearchIndex, tokenize
+
+
+def record(url, name, description=''):
+    return {'url': url, 'name': name, 'description': description}
+
+
+RECORDS = [
+    record('u1', 'Səməd Bəy', 'Azərbaycan mətbəxi, plov və dolma'),
+    record('u2', 'İstanbul Kebab', 'Türk mətbəxi və türk qəhvəsi'),
+    record('u3', 'Pizza Napoli', 'İtaliya mətbəxi, pizza və pasta'),
+    record('u4', 'Pizzeria Bella', 'Odun sobasında pizza'),
+]
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Səməd', 'semed'),
+    ('SƏMƏD', 'semed'),
+    ('İstanbul', 'istanbul'),
+    ('ISTANBUL', 'istanbul'),
+    ('Bakı', 'baki'),
+    ('BAKI', 'baki'),
+    ('Şəki çörəyi', 'seki coreyi'),
+    ('Gəncə ğ ö ü', 'gence g o u'),
+    ('Café Crème', 'cafe creme'),
+])
+def test_normalize_folds_azerbaijani_letters(text, expected):
+    assert normalize(text) == expected
+
+
+def test_tokenize_splits_on_punctuation():
+    assert tokenize('Azərbaycan mətbəxi, plov/dolma!') == ['azerbaycan', 'metbexi', 'plov', 'dolma']
+
+
+def stored_stats(index):
+    return dict(index.conn.execute("SELECT key, value FROM stats"))
+
+
+def recomputed_stats(index):
+    doc_count, total_length = index.conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs").fetchone()
+    return {'doc_count': doc_count, 'total_length': total_length}
+
+
+@pytest.fixture
+def index(tmp_path):
+    with SearchIndex(str(tmp_path / 'search.db')) as index:
+        index.sync(RECORDS)
+        yield index
+
+
+def urls(results):
+    return [r['url'] for r in results]
+
+
+def test_search_matches_folded_spellings(index):
+    assert urls(index.search('semed')) == ['u1']
+    assert urls(index.search('SƏMƏD BƏY')) == ['u1']
+    assert urls(index.search('istanbul')) == ['u2']
+    assert set(urls(index.search('metbexi'))) == {'u1', 'u2', 'u3'}
+
+
+def test_name_matches_outrank_description_matches(index):
+    # 'pizza' is in both descriptions but only one name
+    assert urls(index.search('pizza')) == ['u3', 'u4']
+
+
+def test_prefix_search(index):
+    assert index.search('pizz') == []
+    assert set(urls(index.search('pizz*'))) == {'u3', 'u4'}
+    assert set(urls(index.search('pizz', prefix=True))) == {'u3', 'u4'}
+    assert set(urls(index.search('qəhv*'))) == {'u2'}
+    # A document matched through several expansions is scored once per query term
+    prefixed = index.search('pizz*')
+    assert len(prefixed) == len({r['url'] for r in prefixed})
+
+
+def test_sync_updates_and_removes_incrementally(index):
+    assert stored_stats(index) == recomputed_stats(index)
+
+    changed = [record('u1', 'Səməd Bəy', 'Yalnız kabab'), RECORDS[1], RECORDS[2],
+               record('u5', 'Çay evi', 'Çay və şirniyyat')]
+    assert index.sync(changed) == (2, 1)
+    assert stored_stats(index) == recomputed_stats(index)
+    assert stored_stats(index)['doc_count'] == 4
+
+    assert urls(index.search('plov')) == []
+    assert urls(index.search('kabab')) == ['u1']
+    assert urls(index.search('bella')) == []
+    assert urls(index.search('cay')) == ['u5']
+    # Postings of removed and re-indexed documents are gone, not orphaned
+    assert index.conn.execute(
+        "SELECT COUNT(*) FROM postings WHERE doc_id NOT IN (SELECT doc_id FROM docs)").fetchone() == (0,)
+
+    # Unchanged records are not rewritten
+    assert index.sync(changed) == (0, 0)
+    assert index.sync([]) == (0, 4)
+    assert stored_stats(index) == {'doc_count': 0, 'total_length': 0}
+    assert index.search('kabab') == []
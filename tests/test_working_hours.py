@@ -0,0 +1,75 @@
+import datetime
+
+from working_hours import (DAY_MINUTES, WEEK_MINUTES, LAST_CUSTOMER_CLOSE, HoursIndex,
+                           parse_working_hours)
+
+
+def daily(open_minute, close_minute):
+    """Expected merged intervals for the same hours every day"""
+    intervals = []
+    for day in range(7):
+        start, end = day * DAY_MINUTES + open_minute, day * DAY_MINUTES + close_minute
+        if end > WEEK_MINUTES:
+            intervals += [(start, WEEK_MINUTES), (0, end - WEEK_MINUTES)]
+        else:
+            intervals.append((start, end))
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def test_plain_range():
+    assert parse_working_hours('10:00 — 22:00') == daily(600, 1320)
+    assert parse_working_hours('10:00–02:00') == daily(600, 26 * 60)
+
+
+def test_until_midnight():
+    assert parse_working_hours('10:00-24:00') == daily(600, 1440)
+
+
+def test_missing_separator():
+    assert parse_working_hours('08:30:20:00') == daily(510, 1200)
+
+
+def test_twelve_hour_clock():
+    assert parse_working_hours('6:00 PM - 2:00 AM') == daily(18 * 60, 26 * 60)
+
+
+def test_last_customer():
+    expected = daily(720, LAST_CUSTOMER_CLOSE)
+    assert parse_working_hours('12:00 -sonuncu müştəriyə qədər') == expected
+    assert parse_working_hours('12:00- son müştəriyə kim') == expected
+    assert parse_working_hours('12:00-dan son müştəriyə qədər') == expected
+
+
+def test_always_open():
+    for text in ('24/7', '7/24', '24 saat', '7/24 saat'):
+        assert parse_working_hours(text) == [(0, WEEK_MINUTES)], text
+
+
+def test_always_open_with_explicit_hours():
+    assert (parse_working_hours('24/7 (10:00 - : * Axırıncı müştəriyə qədər)')
+            == daily(600, LAST_CUSTOMER_CLOSE))
+
+
+def test_weekday_ranges():
+    intervals = parse_working_hours('Bazar ertəsi - Cümə: 09:00-18:00; Şənbə: 10:00-15:00')
+    weekdays = [(day * DAY_MINUTES + 540, day * DAY_MINUTES + 1080) for day in range(5)]
+    saturday = [(5 * DAY_MINUTES + 600, 5 * DAY_MINUTES + 900)]
+    assert intervals == weekdays + saturday
+
+
+def test_unparseable():
+    assert parse_working_hours('') == []
+    assert parse_working_hours('Türk, Desertlər') == []
+
+
+def test_index_open_at_past_midnight():
+    index = HoursIndex([parse_working_hours('6:00 PM - 2:00 AM'), parse_working_hours('10:00 — 22:00'), []])
+    # Monday 01:00 is still Sunday night's shift
+    monday_1am = datetime.datetime(2024, 1, 1, 1, 0)
+    assert index.open_at(monday_1am).tolist() == [True, False, False]
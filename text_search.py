@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+On-disk full-text index over restaurant names and descriptions.
+
+Postings live in a SQLite file keyed by normalized term, so a search is one
+indexed lookup (or prefix range scan) per query term followed by BM25
+scoring of the matching documents. Normalization folds Azerbaijani letters
+(İ/I/ı, ə, ğ, ş, ç, ö, ü) so that "Səməd", "SƏMƏD" and "semed" all match.
+
+    python text_search.py build
+    python text_search.py search "türk mətbəxi"
+    python text_search.py search "pizz" --prefix
+"""
+import argparse
+import hashlib
+import logging
+import math
+import re
+import sqlite3
+import time
+from collections import Counter
+from itertools import groupby
+from operator import itemgetter
+from typing import List, Dict, Iterable, Iterator, Tuple
+
+from dataset import load_restaurants, normalize, DEFAULT_CSV
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX = 'bakuguide_search.db'
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text: str) -> List[str]:
+    """Split normalized text into index terms"""
+    return _TOKEN_RE.findall(normalize(text))
+
+
+class SearchIndex:
+    """BM25 inverted index stored in SQLite"""
+
+    K1 = 1.2
+    B = 0.75
+    NAME_BOOST = 3
+
+    def __init__(self, filename: str = DEFAULT_INDEX):
+        self.filename = filename
+        self.conn = sqlite3.connect(filename)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS docs (
+                doc_id INTEGER PRIMARY KEY,
+                url TEXT UNIQUE NOT NULL,
+                name TEXT NOT NULL,
+                length INTEGER NOT NULL,
+                content_hash TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                doc_id INTEGER NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (term, doc_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);
+            CREATE TABLE IF NOT EXISTS stats (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO stats VALUES ('doc_count', 0), ('total_length', 0);
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _terms(self, record: Dict) -> Counter:
+        """Term frequencies for a record; name terms count NAME_BOOST times"""
+        terms = Counter(tokenize(record.get('description', '')))
+        for term in tokenize(record.get('name', '')):
+            terms[term] += self.NAME_BOOST
+        return terms
+
+    @staticmethod
+    def _content_hash(record: Dict) -> str:
+        content = f"{record.get('name', '')}\x1f{record.get('description', '')}"
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    def _adjust_stats(self, doc_delta: int, length_delta: int):
+        self.conn.execute("UPDATE stats SET value = value + ? WHERE key = 'doc_count'", (doc_delta,))
+        self.conn.execute("UPDATE stats SET value = value + ? WHERE key = 'total_length'", (length_delta,))
+
+    def _delete(self, doc_id: int, length: int):
+        self.conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+        self.conn.execute("DELETE FROM docs WHERE doc_id = ?", (doc_id,))
+        self._adjust_stats(-1, -length)
+
+    def upsert(self, records: Iterable[Dict]) -> int:
+        """Add or re-index records whose name/description changed; returns the number written"""
+        written = 0
+        with self.conn:
+            for record in records:
+                url = record.get('url')
+                if not url:
+                    continue
+                content_hash = self._content_hash(record)
+                row = self.conn.execute(
+                    "SELECT doc_id, length, content_hash FROM docs WHERE url = ?", (url,)).fetchone()
+                if row and row[2] == content_hash:
+                    continue
+                if row:
+                    self._delete(row[0], row[1])
+
+                terms = self._terms(record)
+                length = sum(terms.values())
+                cursor = self.conn.execute(
+                    "INSERT INTO docs (url, name, length, content_hash) VALUES (?, ?, ?, ?)",
+                    (url, record.get('name', ''), length, content_hash))
+                self.conn.executemany(
+                    "INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)",
+                    [(term, cursor.lastrowid, tf) for term, tf in terms.items()])
+                self._adjust_stats(1, length)
+                written += 1
+        return written
+
+    def remove(self, urls: Iterable[str]) -> int:
+        """Drop records by URL; returns the number removed"""
+        removed = 0
+        with self.conn:
+            for url in urls:
+                row = self.conn.execute("SELECT doc_id, length FROM docs WHERE url = ?", (url,)).fetchone()
+                if row:
+                    self._delete(*row)
+                    removed += 1
+        return removed
+
+    def sync(self, records: List[Dict]) -> Tuple[int, int]:
+        """Make the index mirror records exactly; returns (written, removed)"""
+        written = self.upsert(records)
+        current = {r.get('url') for r in records}
+        stale = [url for (url,) in self.conn.execute("SELECT url FROM docs") if url not in current]
+        return written, self.remove(stale)
+
+    def _postings(self, term: str, prefix: bool) -> Iterator[Tuple[str, List[Tuple[int, int, int]]]]:
+        """(index term, [(doc_id, tf, doc length)]) for a query term, fetched in one query.
+
+        With prefix=True every index term the query term prefixes matches,
+        found by a range scan on the primary key: [term, term + U+10FFFF).
+        """
+        if prefix:
+            where, params = "p.term >= ? AND p.term < ?", (term, term + '\U0010ffff')
+        else:
+            where, params = "p.term = ?", (term,)
+        rows = self.conn.execute(
+            "SELECT p.term, p.doc_id, p.tf, d.length FROM postings p "
+            f"JOIN docs d ON d.doc_id = p.doc_id WHERE {where} ORDER BY p.term", params)
+        for expanded, group in groupby(rows, key=itemgetter(0)):
+            yield expanded, [row[1:] for row in group]
+
+    def search(self, query: str, limit: int = 10, prefix: bool = False) -> List[Dict]:
+        """BM25-ranked matches for a query.
+
+        With prefix=True every query term also matches longer terms; otherwise
+        only a trailing '*' on a term (e.g. "pizz*") enables prefix matching.
+        """
+        stats = dict(self.conn.execute("SELECT key, value FROM stats"))
+        doc_count = stats['doc_count']
+        if not doc_count:
+            return []
+        avg_length = stats['total_length'] / doc_count
+
+        scores: Dict[int, float] = {}
+        for raw in query.split():
+            is_prefix = prefix or raw.endswith('*')
+            for term in tokenize(raw):
+                # A query term matched through several expansions counts once, at its best
+                best: Dict[int, float] = {}
+                for _, postings in self._postings(term, is_prefix):
+                    df = len(postings)
+                    idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                    for doc_id, tf, length in postings:
+                        norm = self.K1 * (1 - self.B + self.B * length / avg_length)
+                        score = idf * tf * (self.K1 + 1) / (tf + norm)
+                        if score > best.get(doc_id, 0.0):
+                            best[doc_id] = score
+                for doc_id, score in best.items():
+                    scores[doc_id] = scores.get(doc_id, 0.0) + score
+
+        top = sorted(scores.items(), key=lambda item: -item[1])[:limit]
+        if not top:
+            return []
+        docs = {doc_id: (url, name) for doc_id, url, name in self.conn.execute(
+            f"SELECT doc_id, url, name FROM docs WHERE doc_id IN ({', '.join('?' * len(top))})",
+            [doc_id for doc_id, _ in top])}
+        return [{'url': docs[doc_id][0], 'name': docs[doc_id][1], 'score': round(score, 4)}
+                for doc_id, score in top]
+
+
+def main():
+    """Build or query the full-text index"""
+    parser = argparse.ArgumentParser(description='Full-text search over BakuGuide restaurants')
+    parser.add_argument('--index', default=DEFAULT_INDEX, help='SQLite index file')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help='index (or incrementally update from) the CSV')
+    build.add_argument('--csv', default=DEFAULT_CSV)
+
+    search = subparsers.add_parser('search', help='run a ranked query')
+    search.add_argument('query')
+    search.add_argument('--limit', type=int, default=10)
+    search.add_argument('--prefix', action='store_true', help='treat every term as a prefix')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    with SearchIndex(args.index) as index:
+        if args.command == 'build':
+            written, removed = index.sync(load_restaurants(args.csv))
+            logger.info(f"Indexed {written} changed restaurants, removed {removed} from {args.index}")
+        else:
+            start = time.perf_counter()
+            results = index.search(args.query, limit=args.limit, prefix=args.prefix)
+            elapsed = (time.perf_counter() - start) * 1000
+            for result in results:
+                print(f"{result['score']:8.3f}  {result['name']}  {result['url']}")
+            print(f"\n{len(results)} results in {elapsed:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Structured parsing of the free-text `working_hours` field.
+
+Hours are normalized to intervals in "minutes since Monday 00:00" over one
+week, so "10:00 - 02:00" becomes seven intervals that each run past
+midnight into the next day. HoursIndex stacks the intervals of the whole
+catalog into flat NumPy arrays so open-at and open-for-N-hours questions
+are answered for every venue in one vectorized pass.
+"""
+import datetime
+import re
+from typing import List, Dict, Tuple
+
+import numpy as np
+
+from dataset import normalize
+
+DAY_MINUTES = 24 * 60
+WEEK_MINUTES = 7 * DAY_MINUTES
+
+# "Until the last customer" has no closing time; assume 02:00 the next day
+LAST_CUSTOMER_CLOSE = 26 * 60
+
+_ALWAYS_OPEN_RE = re.compile(r'24\s*/\s*7|7\s*/\s*24|^24\s*saat')
+_LAST_CUSTOMER_RE = re.compile(r'(son|sonuncu|axirinci)\s+musteri')
+_TIME_RE = re.compile(r'(\d{1,2})(?:\s*[:.]\s*(\d{2})?)?\s*([ap]m)?')
+
+# Normalized Azerbaijani day names, longest first so "cume axsami" wins over "cume"
+_DAYS = [
+    ('cersenbe axsami', 1), ('cume axsami', 3), ('bazar ertesi', 0), ('bazarertesi', 0),
+    ('cersenbe', 2), ('cume', 4), ('senbe', 5), ('bazar', 6),
+]
+_DAY_RE = re.compile('|'.join(name for name, _ in _DAYS))
+_DAY_NUMBER = dict(_DAYS)
+
+
+def _parse_days(text: str) -> Tuple[List[int], str]:
+    """Weekdays named at the start of a segment and the remaining text"""
+    names = list(_DAY_RE.finditer(text))
+    if not names:
+        return list(range(7)), text
+    first = _DAY_NUMBER[names[0].group()]
+    if len(names) > 1 and '-' in text[names[0].end():names[1].start()]:
+        last = _DAY_NUMBER[names[1].group()]
+        days = [(first + i) % 7 for i in range((last - first) % 7 + 1)]
+        rest = text[names[1].end():]
+    else:
+        days = [_DAY_NUMBER[m.group()] for m in names]
+        rest = text[names[-1].end():]
+    return days, rest
+
+
+def _parse_times(text: str) -> List[int]:
+    """Clock times in a segment as minutes after midnight"""
+    times = []
+    for hour, minute, meridiem in _TIME_RE.findall(text):
+        hour, minute = int(hour), int(minute or 0)
+        if meridiem == 'pm' and hour < 12:
+            hour += 12
+        elif meridiem == 'am' and hour == 12:
+            hour = 0
+        if hour <= 24 and minute < 60:
+            times.append(hour * 60 + minute)
+    return times
+
+
+def _merge(intervals: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Sort and merge overlapping or touching intervals"""
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def parse_working_hours(text: str) -> List[Tuple[int, int]]:
+    """Weekly open intervals for a working-hours string.
+
+    Intervals are (start, end) minutes since Monday 00:00 with
+    0 <= start < end <= WEEK_MINUTES; an interval running past Sunday
+    midnight is split in two. Returns [] when the text can't be parsed.
+    """
+    text = normalize(text).strip()
+    if not text:
+        return []
+    if _ALWAYS_OPEN_RE.search(text):
+        rest = _ALWAYS_OPEN_RE.sub(' ', text)
+        if not _parse_times(rest):
+            return [(0, WEEK_MINUTES)]
+        # "24/7 (10:00 - until the last customer)" means daily, at those hours
+        text = rest
+
+    intervals = []
+    for segment in re.split(r'[;\n]+', text):
+        days, rest = _parse_days(segment)
+        times = _parse_times(rest)
+        if len(times) % 2 and _LAST_CUSTOMER_RE.search(rest):
+            times.append(LAST_CUSTOMER_CLOSE)
+        if not times or len(times) % 2:
+            continue
+
+        for open_time, close_time in zip(times[::2], times[1::2]):
+            if close_time <= open_time:
+                # Closes after midnight
+                close_time += DAY_MINUTES
+            for day in days:
+                start = day * DAY_MINUTES + open_time
+                end = day * DAY_MINUTES + close_time
+                if end > WEEK_MINUTES:
+                    intervals.append((start, WEEK_MINUTES))
+                    intervals.append((0, end - WEEK_MINUTES))
+                else:
+                    intervals.append((start, end))
+
+    return _merge(intervals)
+
+
+def minute_of_week(when: datetime.datetime) -> int:
+    """Minutes since Monday 00:00 for a datetime"""
+    return when.weekday() * DAY_MINUTES + when.hour * 60 + when.minute
+
+
+class HoursIndex:
+    """Flat interval arrays over the parsed hours of a whole catalog"""
+
+    def __init__(self, schedules: List[List[Tuple[int, int]]]):
+        self.size = len(schedules)
+        self.known = np.array([bool(s) for s in schedules], dtype=bool)
+        self.always_open = np.array([s == [(0, WEEK_MINUTES)] for s in schedules], dtype=bool)
+        self.minutes_per_week = np.array([sum(e - s for s, e in sched) for sched in schedules], dtype=np.int64)
+
+        # Tile each schedule over three weeks and re-merge, so intervals that
+        # wrap across Sunday midnight become one continuous interval. Keep the
+        # ones touching the middle week, shifted back to [0, WEEK_MINUTES).
+        owners, starts, ends = [], [], []
+        for row, schedule in enumerate(schedules):
+            tiled = [(s + k * WEEK_MINUTES, e + k * WEEK_MINUTES) for k in range(3) for s, e in schedule]
+            for start, end in _merge(tiled):
+                if end > WEEK_MINUTES and start < 2 * WEEK_MINUTES:
+                    owners.append(row)
+                    starts.append(start - WEEK_MINUTES)
+                    ends.append(end - WEEK_MINUTES)
+
+        self.owner = np.array(owners, dtype=np.int64)
+        self.start = np.array(starts, dtype=np.int64)
+        self.end = np.array(ends, dtype=np.int64)
+
+    @classmethod
+    def from_records(cls, records: List[Dict]) -> 'HoursIndex':
+        """Parse the working_hours of scraped restaurant dicts"""
+        return cls([parse_working_hours(r.get('working_hours', '')) for r in records])
+
+    def _as_minute(self, when) -> int:
+        if isinstance(when, datetime.datetime):
+            return minute_of_week(when)
+        return int(when) % WEEK_MINUTES
+
+    def _rows(self, hits: np.ndarray) -> np.ndarray:
+        """Per-venue mask from a mask over intervals"""
+        return np.bincount(self.owner[hits], minlength=self.size) > 0
+
+    def open_at(self, when) -> np.ndarray:
+        """Mask of venues open at a datetime or minute-of-week"""
+        t = self._as_minute(when)
+        return self._rows((self.start <= t) & (t < self.end))
+
+    def open_for(self, hours: float, when=None) -> np.ndarray:
+        """Mask of venues open for at least `hours` in a row.
+
+        With `when`, the stretch must start at that moment; otherwise any
+        stretch during the week counts.
+        """
+        minutes = hours * 60
+        if when is None:
+            return self._rows(np.minimum(self.end - self.start, WEEK_MINUTES) >= minutes)
+        t = self._as_minute(when)
+        return self._rows((self.start <= t) & (t < self.end) & (self.end - t >= minutes))
+
+    def open_between(self, start, end) -> np.ndarray:
+        """Mask of venues open for the whole span from start to end"""
+        t0, t1 = self._as_minute(start), self._as_minute(end)
+        if t1 <= t0:
+            t1 += WEEK_MINUTES
+        return self._rows((self.start <= t0) & (self.end >= t1))